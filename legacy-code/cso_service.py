@@ -1,5 +1,6 @@
 import os
 import rdflib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from langchain_neo4j import Neo4jGraph
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
@@ -24,7 +25,7 @@ class CSOService:
         )
         self.chain = self.prompt | self.llm | self.parser
 
-    def extract_topics_with_hierarchy(self, cso_file_path: str, max_depth: int = 4) -> List[Dict]:
+    def extract_topics_with_hierarchy(self, cso_file_path: str, max_depth: int = 4, max_workers: int = 8) -> List[Dict]:
         """Extracts topics from CSO RDF file, limited to max_depth hierarchy levels, excluding root topics like 'computer science'."""
         print(f"Loading CSO ontology from {cso_file_path}...")
         g = rdflib.Graph()
@@ -70,23 +71,34 @@ class CSOService:
         filtered_topics = [t for t in topic_data if t["uri"] in valid_topics]
         print(f"Filtered to {len(filtered_topics)} topics with depth <= {max_depth}.")
 
-        # Proses topik dengan LLM untuk nama panjang
+        # Proses topik dengan LLM untuk nama panjang (batch dikirim paralel)
         batch_size = 50
+        batches = [filtered_topics[i:i + batch_size] for i in range(0, len(filtered_topics), batch_size)]
+        outputs = [None] * len(batches)
+        with ThreadPoolExecutor(max_workers=max_workers) as ex:
+            futures = {
+                ex.submit(self.chain.invoke, {"topics": ", ".join(t["label"] for t in batch)}): idx
+                for idx, batch in enumerate(batches)
+            }
+            for fut in as_completed(futures):
+                idx = futures[fut]
+                try:
+                    outputs[idx] = fut.result()
+                    print(f"  > LLM output for batch {idx + 1}: {outputs[idx]}")
+                except Exception as e:
+                    print(f"  > Error processing batch {idx + 1}: {e}")
+
+        # Gabungkan hasil sesuai urutan batch
         validated_topics = []
-        for i in range(0, len(filtered_topics), batch_size):
-            batch = filtered_topics[i:i + batch_size]
-            topic_labels = [t["label"] for t in batch]
-            try:
-                llm_output = self.chain.invoke({"topics": ", ".join(topic_labels)})
-                print(f"  > LLM output for batch {i//batch_size + 1}: {llm_output}")
-                for topic, llm_result in zip(batch, llm_output):
-                    if llm_result["expanded_label"] != "unknown":
-                        validated_topics.append({
-                            "uri": topic["uri"],
-                            "label": llm_result["expanded_label"]
-                        })
-            except Exception as e:
-                print(f"  > Error processing batch {i//batch_size + 1}: {e}")
+        for batch, llm_output in zip(batches, outputs):
+            if not llm_output:
+                continue
+            for topic, llm_result in zip(batch, llm_output):
+                if llm_result["expanded_label"] != "unknown":
+                    validated_topics.append({
+                        "uri": topic["uri"],
+                        "label": llm_result["expanded_label"]
+                    })
 
         print(f"Validated {len(validated_topics)} topics.")
         return validated_topics, hierarchy_data
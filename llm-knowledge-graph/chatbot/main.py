@@ -1,3 +1,4 @@
+import streamlit as st
 from config.settings import Settings
 from src.services.graph_service import GraphService
 from src.services.llm_service import LLMService
@@ -6,13 +7,19 @@ from src.services.topic_service import TopicService
 from src.agent.chatbot_agent import ChatbotAgent
 from src.ui.streamlit_ui import StreamlitUI
 
-def main():
-    # Initialize Services
+@st.cache_resource(show_spinner=False)
+def build_agent() -> ChatbotAgent:
+    """Services are built once per server process, so Neo4j/Gemini clients and their connection pools
+    survive Streamlit reruns (chat memory is per session_id in Neo4j, not on the agent)."""
     graph_service = GraphService()
     llm_service = LLMService(api_key=Settings.GEMINI_API_KEY, model_name=Settings.GEMINI_LLM_MODEL)
     topic_service = TopicService(graph_service=graph_service, llm_service=llm_service)
     vector_service = VectorService(graph_service=graph_service, llm_service=llm_service)
-    agent = ChatbotAgent(graph_service=graph_service, vector_service=vector_service, llm_service=llm_service, topic_service=topic_service)
+    return ChatbotAgent(graph_service=graph_service, vector_service=vector_service, llm_service=llm_service, topic_service=topic_service)
+
+def main():
+    # Initialize Services (cached across reruns)
+    agent = build_agent()
     
     # Initialize UI
     ui = StreamlitUI(agent=agent)
@@ -1,6 +1,6 @@
 from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+from langchain_core.output_parsers import StrOutputParser, JsonOutputParser
 from google.api_core import retry
 
 class LLMService:
@@ -33,26 +33,61 @@ class LLMService:
     def extract_topics(self, text: str) -> list:
         """Extract topics from text."""
         prompt = ChatPromptTemplate.from_messages([
-            ("system", "Extract up to 5 key computer science topics from the text. Return as a list of strings.\nText: {text}"),
+            ("system", "Extract up to 5 key computer science topics from the text. Return a JSON list of strings.\nText: {text}"),
             ("human", "Extract topics")
         ])
-        chain = prompt | self.llm | StrOutputParser()
+        chain = prompt | self.llm | JsonOutputParser()
         try:
-            return eval(chain.invoke({"text": text}))  # Assuming output is a valid Python list
+            topics = chain.invoke({"text": text})
+            return [t for t in topics if isinstance(t, str)] if isinstance(topics, list) else []
         except Exception as e:
             print(f"Error extracting topics: {e}")
             return []
     
-    @retry.Retry(predicate=retry.if_transient_error)
-    def validate_topic(self, topic: str, cso_topics: list, hierarchy: list) -> dict:
-        """Validate topic against CSO topics and hierarchy."""
+    def _validate_chain(self):
         prompt = ChatPromptTemplate.from_messages([
-            ("system", "Validate the topic against CSO topics and hierarchy. Return {'matched_topic': 'topic' or 'None'}.\nCSO Topics: {cso_topics}\nHierarchy: {hierarchy}\nTopic: {topic}"),
+            ("system", "Validate the topic against CSO topics and hierarchy. Return JSON: {{\"matched_topic\": \"<topic>\" or \"None\"}}.\nCSO Topics: {cso_topics}\nHierarchy: {hierarchy}\nTopic: {topic}"),
             ("human", "Validate topic")
         ])
-        chain = prompt | self.llm | StrOutputParser()
+        return prompt | self.llm | JsonOutputParser()
+    
+    @staticmethod
+    def _as_validation(output) -> dict:
+        if isinstance(output, dict) and isinstance(output.get("matched_topic"), str):
+            return output
+        raise ValueError(f"unexpected validation output: {output!r}")
+    
+    @retry.Retry(predicate=retry.if_transient_error)
+    def validate_topic(self, topic: str, cso_topics: list, hierarchy: list) -> dict:
+        """Validate topic against CSO topics and hierarchy."""
+        chain = self._validate_chain()
         try:
-            return eval(chain.invoke({"topic": topic, "cso_topics": cso_topics, "hierarchy": hierarchy}))
+            return self._as_validation(chain.invoke({"topic": topic, "cso_topics": cso_topics, "hierarchy": hierarchy}))
         except Exception as e:
             print(f"Error validating topic: {e}")
-            return {"matched_topic": "None"}
\ No newline at end of file
+            return {"matched_topic": "None"}
+    
+    @retry.Retry(predicate=retry.if_transient_error)
+    def _invoke_validation(self, chain, inputs: dict) -> dict:
+        return self._as_validation(chain.invoke(inputs))
+    
+    def validate_topics(self, topics: list, cso_topics: list, hierarchy: list, max_concurrency: int = 8) -> list:
+        """Validate several topics in one concurrent batch; results follow the input order.
+        Sync batch (thread pool), so the cached Gemini client is never reused across event loops."""
+        chain = self._validate_chain()
+        inputs = [{"topic": topic, "cso_topics": cso_topics, "hierarchy": hierarchy} for topic in topics]
+        outputs = chain.batch(inputs, config={"max_concurrency": max_concurrency}, return_exceptions=True)
+        results = []
+        for topic, topic_inputs, output in zip(topics, inputs, outputs):
+            try:
+                if isinstance(output, Exception):
+                    if not retry.if_transient_error(output):
+                        raise output
+                    # transient (429/503...): retry this topic with backoff, like validate_topic
+                    results.append(self._invoke_validation(chain, topic_inputs))
+                else:
+                    results.append(self._as_validation(output))
+            except Exception as e:
+                print(f"Error validating topic '{topic}': {e}")
+                results.append({"matched_topic": "None"})
+        return results
@@ -29,9 +29,9 @@ class TopicService:
         try:
             candidate_topics = self.llm_service.extract_topics(text)
             validated_topics = set()
-            for candidate in candidate_topics:
-                result = self.llm_service.validate_topic(candidate, self.cso_topics, self.hierarchy)
-                if result["matched_topic"] != "None":
+            results = self.llm_service.validate_topics(candidate_topics, self.cso_topics, self.hierarchy)
+            for result in results:
+                if result.get("matched_topic", "None") != "None":
                     validated_topics.add(result["matched_topic"])
             return list(validated_topics)[:5]
         except Exception as e:
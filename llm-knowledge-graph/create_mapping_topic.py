@@ -169,25 +169,7 @@ def main():
                 print(" > No valid topic strings after normalization.")
             else:
                 # Attempt linking only for topics that exist in DB
-                link_result = graph_service.graph.query("""
-                    MATCH (p:Paper {filename: $filename})
-                    WITH p
-                    UNWIND $topics AS topicLabel
-                    OPTIONAL MATCH (t:Topic {label: topicLabel})
-                    WITH p, topicLabel, t
-                    CALL {
-                      WITH p, t
-                      WITH p, t
-                      WHERE t IS NOT NULL
-                      MERGE (p)-[:HAS_TOPIC]->(t)
-                      RETURN count(*) AS _c
-                    }
-                    RETURN collect({topic: topicLabel, exists: t IS NOT NULL}) AS status
-                """, {"filename": selected["filename"], "topics": unique_topics})
-
-                status = link_result[0]["status"] if link_result else []
-                missing = [s["topic"] for s in status if not s["exists"]]
-                linked = [s["topic"] for s in status if s["exists"]]
+                linked, missing = graph_service.upsert_topic_links(selected["filename"], unique_topics)
 
                 print(f" > Linked topics: {linked}")
                 if missing:
@@ -29,6 +29,7 @@ def main():
         neo4j_password=NEO4J_PASSWORD,
         llm=None,
         embed_model=os.getenv("CSO_EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2"),
+        embed_backend=os.getenv("CSO_EMBED_BACKEND", "torch"),
     )
 
     if ask("Do you want to CLEAR existing TOPIC nodes before import? ", default="n"):
@@ -14,7 +14,8 @@ def main():
     llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", google_api_key=GEMINI_API_KEY, temperature=0)
     graph_service = GraphService(url=NEO4J_URI, username=NEO4J_USERNAME, password=NEO4J_PASSWORD)
 
-    svc = LLMAprioriService(llm=llm, graph_service=graph_service)
+    svc = LLMAprioriService(llm=llm, graph_service=graph_service,
+                            use_llm=os.getenv("APRIORI_USE_LLM", "0") == "1")
     svc.build_llm_apriori_graph(
         min_support_count=2,
         min_confidence=0.7,
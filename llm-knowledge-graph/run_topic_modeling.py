@@ -1,5 +1,6 @@
 import os
 import re
+import sys
 from typing import Dict, Any, List
 from dotenv import load_dotenv
 from langchain_community.document_loaders import DirectoryLoader, PyPDFLoader
@@ -13,7 +14,10 @@ def _clean_page(s: str) -> str:
 
 
 def load_pdfs(folder: str) -> Dict[str, str]:
-    loader = DirectoryLoader(folder, glob="**/*.pdf", loader_cls=PyPDFLoader, show_progress=True)
+    loader = DirectoryLoader(
+        folder, glob="**/*.pdf", loader_cls=PyPDFLoader, show_progress=True,
+        use_multithreading=True, max_concurrency=8,
+    )
     docs = loader.load()
     pdf_docs: Dict[str, List[str]] = {}
     for d in docs:
@@ -69,33 +73,37 @@ def choose_files(pdfs: Dict[str, str]) -> Dict[str, str]:
 
 
 def print_model_results(model_name: str, results: Dict[str, Any], top_terms_preview: int = 10):
-    print(f"\n=== {model_name} Results ===")
-    print(f"Docs: {results.get('n_docs', 0)} | Topics: {results.get('n_topics', 0)}")
+    # Build the whole report first and write it once instead of one print() per line
+    lines = [
+        f"\n=== {model_name} Results ===",
+        f"Docs: {results.get('n_docs', 0)} | Topics: {results.get('n_topics', 0)}",
+    ]
 
     # Topics
     topics = results.get("topics", [])
     if topics:
-        print("\nGenerated Topics:")
+        lines.append("\nGenerated Topics:")
         for topic in topics:
-            words = topic.get("top_words", [])
-            weights = topic.get("weights", [])
-            print(f"\nTopic {topic['topic_id']}:")
-            for w, ww in zip(words[:top_terms_preview], weights[:top_terms_preview]):
-                print(f"  - {w}: {ww:.4f}")
+            words = topic.get("top_words", [])[:top_terms_preview]
+            weights = topic.get("weights", [])[:top_terms_preview]
+            lines.append(f"\nTopic {topic['topic_id']}:")
+            lines.extend(f"  - {w}: {ww:.4f}" for w, ww in zip(words, weights))
     else:
-        print("\n(no topics)")
+        lines.append("\n(no topics)")
 
     # Terms per document
     docs_terms = results.get("doc_terms", [])
     if docs_terms:
-        print("\nDocument Terms:")
+        lines.append("\nDocument Terms:")
         for doc in docs_terms:
-            print(f"\nDocument: {doc['filename']}")
-            print("Terms and weights:")
-            for term, weight in doc["terms"][:top_terms_preview]:
-                print(f"  - {term}: {weight:.4f}")
+            lines.append(f"\nDocument: {doc['filename']}")
+            lines.append("Terms and weights:")
+            lines.extend(f"  - {term}: {weight:.4f}" for term, weight in doc["terms"][:top_terms_preview])
     else:
-        print("\n(no doc terms)")
+        lines.append("\n(no doc terms)")
+
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
 
 
 def main():
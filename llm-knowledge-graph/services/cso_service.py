@@ -1,5 +1,6 @@
 from __future__ import annotations
 import os, json, re
+from functools import lru_cache
 from typing import List, Dict, Tuple, Optional
 import rdflib
 import numpy as np
@@ -13,15 +14,20 @@ from sentence_transformers import SentenceTransformer
 from langchain_neo4j import Neo4jGraph
 
 
+_PAREN_RE = re.compile(r"\s*\([^)]+\)\s*")
+_WS_RE = re.compile(r"\s+")
+
+@lru_cache(maxsize=65536)
 def _normalize_label(text: str) -> str:
     if not isinstance(text, str):
         return ""
     text = text.strip().lower()
     text = text.replace("-", " ")
-    text = re.sub(r"\s*\([^)]+\)\s*", " ", text)
-    text = re.sub(r"\s+", " ", text)
+    text = _PAREN_RE.sub(" ", text)
+    text = _WS_RE.sub(" ", text)
     return text
 
+@lru_cache(maxsize=65536)
 def _canonical_form(label: str) -> str:
     s = _normalize_label(label)
     parts = s.split()
@@ -47,15 +53,24 @@ class CSOService:
         neo4j_password: str,
         llm=None,
         embed_model: str = "sentence-transformers/all-MiniLM-L6-v2",
+        embed_backend: str = "torch",
     ):
         self.graph = Neo4jGraph(url=neo4j_uri, username=neo4j_username, password=neo4j_password)
         self.llm = llm
         self.embed_model_name = embed_model
+        self.embed_backend = embed_backend
         self.embedder: Optional[SentenceTransformer] = None
         self._ensure_embedder()
 
     def _ensure_embedder(self):
         if self.embedder is None:
+            if self.embed_backend != "torch":
+                # "onnx" / "openvino" need: pip install "sentence-transformers[onnx]" (or [openvino])
+                try:
+                    self.embedder = SentenceTransformer(self.embed_model_name, backend=self.embed_backend)
+                    return
+                except Exception as e:
+                    print(f"Warning: could not load '{self.embed_backend}' backend ({e}); falling back to torch.")
             self.embedder = SentenceTransformer(self.embed_model_name)
             
     def ensure_constraints(self):
@@ -76,9 +91,11 @@ class CSOService:
         except:
             pass
         self.graph.query("MATCH (t:Topic) DETACH DELETE t")
+        _normalize_label.cache_clear()
+        _canonical_form.cache_clear()
         print("Database cleared.")
 
-    def extract_topics_with_hierarchy(self, cso_file_path: str, max_depth: int = 4) -> Tuple[List[Dict], List[Dict]]:
+    def _parse_cso_file(self, cso_file_path: str) -> Tuple[List[Dict], List[Dict]]:
         print(f"Loading CSO ontology from {cso_file_path}...")
         g = rdflib.Graph()
         g.parse(cso_file_path, format="turtle")
@@ -95,7 +112,7 @@ class CSOService:
         }
         """
         results = g.query(topic_query)
-        topic_data = [{"uri": str(r.uri), "label": str(r.label)} for r in results]
+        topic_data = [{"uri": str(uri), "label": str(label)} for uri, label in results]
         print(f"Found {len(topic_data)} topics. Loading hierarchy...")
 
         hierarchy_query = """
@@ -106,60 +123,88 @@ class CSOService:
         }
         """
         hierarchy_results = g.query(hierarchy_query)
-        hierarchy_data = [{"sub": str(r.sub_topic), "super": str(r.super_topic)} for r in hierarchy_results]
+        hierarchy_data = [{"sub": str(sub), "super": str(sup)} for sub, sup in hierarchy_results]
+        return topic_data, hierarchy_data
+
+    def _load_cso_rows(self, cso_file_path: str, use_cache: bool = True) -> Tuple[List[Dict], List[Dict]]:
+        # Parsing the Turtle file is slow, so keep the query results next to it and reuse while still fresh
+        cache_path = cso_file_path + ".parsed.json"
+        if (use_cache and os.path.exists(cache_path)
+                and os.path.getmtime(cache_path) >= os.path.getmtime(cso_file_path)):
+            try:
+                with open(cache_path, "r", encoding="utf-8") as f:
+                    cached = json.load(f)
+                print(f"Loaded parsed CSO cache from {cache_path}.")
+                return cached["topics"], cached["hierarchy"]
+            except Exception as e:
+                print(f"Warning: could not read CSO cache ({e}); re-parsing.")
+
+        topic_data, hierarchy_data = self._parse_cso_file(cso_file_path)
+        if use_cache:
+            try:
+                with open(cache_path, "w", encoding="utf-8") as f:
+                    json.dump({"topics": topic_data, "hierarchy": hierarchy_data}, f, ensure_ascii=False)
+                print(f"Saved parsed CSO cache -> {cache_path}")
+            except OSError as e:
+                print(f"Warning: could not write CSO cache: {e}")
+        return topic_data, hierarchy_data
+
+    def extract_topics_with_hierarchy(
+        self, cso_file_path: str, max_depth: int = 4, use_cache: bool = True
+    ) -> Tuple[List[Dict], List[Dict]]:
+        topic_data, hierarchy_data = self._load_cso_rows(cso_file_path, use_cache=use_cache)
 
         # Filter by depth
         if max_depth is None:
             print("No depth filter applied (max_depth=None).")
             filtered = topic_data
         else:
-            valid_uris = set()
-            for t in topic_data:
-                d = self._calculate_depth(t["uri"], hierarchy_data, max_depth=max_depth)
-                if d <= max_depth:
-                    valid_uris.add(t["uri"])
-            filtered = [t for t in topic_data if t["uri"] in valid_uris]
+            parent_of: Dict[str, str] = {}  # sub -> first super
+            for h in hierarchy_data:
+                parent_of.setdefault(h["sub"], h["super"])
+            filtered = [
+                t for t in topic_data
+                if self._calculate_depth(t["uri"], parent_of, max_depth=max_depth) <= max_depth
+            ]
             print(f"Filtered to {len(filtered)} topics with depth ≤ {max_depth}.")
 
         return filtered, hierarchy_data
 
-    def _calculate_depth(self, topic_uri: str, hierarchy_data: List[Dict], max_depth: int = 4) -> int:
-        if not hierarchy_data:
-            return 1
+    def _calculate_depth(self, topic_uri: str, parent_of: Dict[str, str], max_depth: int = 4) -> int:
         depth = 1
         cur = topic_uri
         while depth <= max_depth:
-            parents = [h["super"] for h in hierarchy_data if h["sub"] == cur]
-            if not parents:
+            parent = parent_of.get(cur)
+            if parent is None:
                 break
             depth += 1
-            cur = parents[0]
+            cur = parent
         return depth
 
     def import_to_neo4j(self, topics: List[Dict], hierarchy_data: List[Dict]):
         self.ensure_constraints()
         
         print(f"Importing {len(topics)} topics to Neo4j (merge by label_norm)...")
-        enriched = []
+        # Collapse variants sharing a canonical form before sending them to Neo4j
+        agg: Dict[str, Dict] = {}
         for t in topics:
-            enriched.append({
-                "uri": t["uri"], 
-                "label": t["label"],
-                "label_norm": _canonical_form(t["label"]),
-            })
-            
+            label_norm = _canonical_form(t["label"])
+            cur = agg.setdefault(label_norm, {"label_norm": label_norm, "label": t["label"], "uris": []})
+            if t["uri"] not in cur["uris"]:
+                cur["uris"].append(t["uri"])
+            cur["label"] = min(cur["label"], t["label"], key=len)
+        enriched = list(agg.values())
+        print(f"Collapsed to {len(enriched)} unique canonical topics.")
+
         self.graph.query(
             """
             UNWIND $topics AS topic
             MERGE (t:Topic {label_norm: topic.label_norm})
             ON CREATE SET 
                 t.label = topic.label,
-                t.uris = [topic.uri]
+                t.uris = topic.uris
             ON MATCH SET 
-                t.uris = CASE 
-                    WHEN topic.uri IN t.uris THEN t.uris 
-                    ELSE t.uris + topic.uri 
-                END,
+                t.uris = coalesce(t.uris, []) + [u IN topic.uris WHERE NOT u IN coalesce(t.uris, [])],
                 t.label = CASE 
                     WHEN size(topic.label) < size(t.label) THEN topic.label 
                     ELSE t.label 
@@ -211,17 +256,10 @@ class CSOService:
             return
         
         print(f"Found {len(duplicate_groups)} groups of duplicates to merge...")
-        
+
+        groups = []
         for group in duplicate_groups:
-            norm = group["norm"]
             nodes = group["nodeInfo"]
-            
-            # Keep the first node, merge others into it
-            keep_id = nodes[0]["id"]
-            merge_ids = [n["id"] for n in nodes[1:]]
-            
-            print(f"Merging {len(merge_ids)} duplicates for '{norm}' into {keep_id}")
-            
             all_uris = []
             for n in nodes:
                 if n["uris"]:
@@ -229,40 +267,68 @@ class CSOService:
                         all_uris.extend(n["uris"])
                     else:
                         all_uris.append(n["uris"])
-            
+            # Keep the first node, merge others into it
+            groups.append({
+                "norm": group["norm"],
+                "ids": [n["id"] for n in nodes],
+                "uris": list(set(all_uris)),
+            })
+
+        try:
+            # All groups in one round trip / transaction
             self.graph.query("""
-                MATCH (keep:Topic) WHERE elementId(keep) = $keepId
-                SET keep.uris = $allUris
-            """, {"keepId": keep_id, "allUris": list(set(all_uris))})
-            
-            # Transfer all relationships from duplicates to the kept node
-            for merge_id in merge_ids:
-                # Transfer incoming relationships
-                self.graph.query("""
-                    MATCH (source)-[r]->(dup:Topic) WHERE elementId(dup) = $dupId
-                    MATCH (keep:Topic) WHERE elementId(keep) = $keepId
-                    WITH source, r, keep, type(r) AS relType, properties(r) AS props
-                    CALL apoc.create.relationship(source, relType, props, keep) YIELD rel
-                    DELETE r
-                """, {"dupId": merge_id, "keepId": keep_id})
-                
-                # Transfer outgoing relationships  
-                self.graph.query("""
-                    MATCH (dup:Topic)-[r]->(target) WHERE elementId(dup) = $dupId
-                    MATCH (keep:Topic) WHERE elementId(keep) = $keepId
-                    WITH keep, r, target, type(r) AS relType, properties(r) AS props
-                    CALL apoc.create.relationship(keep, relType, props, target) YIELD rel
-                    DELETE r
-                """, {"dupId": merge_id, "keepId": keep_id})
-                
-                # Delete the duplicate node
-                self.graph.query("""
-                    MATCH (dup:Topic) WHERE elementId(dup) = $dupId
-                    DELETE dup
-                """, {"dupId": merge_id})
-        
+                UNWIND $groups AS g
+                MATCH (n:Topic) WHERE elementId(n) IN g.ids
+                WITH g, collect(n) AS found
+                WITH g, [id IN g.ids | head([n IN found WHERE elementId(n) = id])] AS nodes
+                CALL apoc.refactor.mergeNodes(nodes, {properties: 'discard', mergeRels: true}) YIELD node
+                SET node.uris = g.uris
+                RETURN count(node) AS merged
+            """, {"groups": groups})
+        except Exception as e:
+            print(f"Batched merge failed ({e}); falling back to per-group merging...")
+            for g in groups:
+                self._merge_duplicate_group(g["norm"], g["ids"], g["uris"])
+
         print("Duplicate merging completed.")
 
+    def _merge_duplicate_group(self, norm: str, ids: List[str], all_uris: List[str]):
+        keep_id = ids[0]
+        merge_ids = ids[1:]
+
+        print(f"Merging {len(merge_ids)} duplicates for '{norm}' into {keep_id}")
+
+        self.graph.query("""
+            MATCH (keep:Topic) WHERE elementId(keep) = $keepId
+            SET keep.uris = $allUris
+        """, {"keepId": keep_id, "allUris": all_uris})
+
+        # Transfer all relationships from duplicates to the kept node
+        for merge_id in merge_ids:
+            # Transfer incoming relationships
+            self.graph.query("""
+                MATCH (source)-[r]->(dup:Topic) WHERE elementId(dup) = $dupId
+                MATCH (keep:Topic) WHERE elementId(keep) = $keepId
+                WITH source, r, keep, type(r) AS relType, properties(r) AS props
+                CALL apoc.create.relationship(source, relType, props, keep) YIELD rel
+                DELETE r
+            """, {"dupId": merge_id, "keepId": keep_id})
+
+            # Transfer outgoing relationships  
+            self.graph.query("""
+                MATCH (dup:Topic)-[r]->(target) WHERE elementId(dup) = $dupId
+                MATCH (keep:Topic) WHERE elementId(keep) = $keepId
+                WITH keep, r, target, type(r) AS relType, properties(r) AS props
+                CALL apoc.create.relationship(keep, relType, props, target) YIELD rel
+                DELETE r
+            """, {"dupId": merge_id, "keepId": keep_id})
+
+            # Delete the duplicate node
+            self.graph.query("""
+                MATCH (dup:Topic) WHERE elementId(dup) = $dupId
+                DELETE dup
+            """, {"dupId": merge_id})
+
     def build_and_save_cso_index(
         self,
         topics: List[Dict],
@@ -270,7 +336,10 @@ class CSOService:
         labels_path: str = "data/cso_labels.json",
         use_normalized: bool = True,
         batch_size: int = 512,
+        quantize_int8: bool = True,
     ):
+        """Embed CSO labels and save a FAISS inner-product index.
+        With quantize_int8 the vectors are stored as 8-bit scalars (4x smaller, recall ~1% lower than fp32)."""
         if faiss is None:
             raise RuntimeError("faiss is not available. please install it with: pip install faiss-cpu")
 
@@ -288,7 +357,12 @@ class CSOService:
         vecs = np.asarray(vecs, dtype="float32")
         dim = vecs.shape[1]
 
-        index = faiss.IndexFlatIP(dim)  # cosine similarity via dot-product on normalized vectors
+        # cosine similarity via dot-product on normalized vectors
+        if quantize_int8:
+            index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+            index.train(vecs)
+        else:
+            index = faiss.IndexFlatIP(dim)
         index.add(vecs)
 
         os.makedirs(os.path.dirname(index_path), exist_ok=True)
@@ -310,14 +384,46 @@ class CSOService:
     def search_topics(self, terms: List[str], top_k: int, index, labels: List[str]):
         if not terms:
             return []
+        # Embed/search each distinct normalized term once, then gather back per input term
+        uniq: List[str] = []
+        index_of: Dict[str, int] = {}
+        inv: List[int] = []
+        for t in terms:
+            norm = _normalize_label(t)
+            i = index_of.get(norm)
+            if i is None:
+                i = index_of[norm] = len(uniq)
+                uniq.append(norm)
+            inv.append(i)
+
         q = self.embedder.encode(
-            [_normalize_label(t) for t in terms],
+            uniq,
             convert_to_numpy=True,
-            normalize_embeddings=True,
+            normalize_embeddings=False,
         ).astype("float32")
-        D, I = index.search(q, top_k)
+        q /= np.linalg.norm(q, axis=1, keepdims=True) + 1e-12  # L2 in numpy, in place
+        D_u, I_u = index.search(q, top_k)
+        D, I = D_u[inv], I_u[inv]
         out = []
         for i, term in enumerate(terms):
             cand = [(labels[j], float(D[i, k])) for k, j in enumerate(I[i])]
             out.append(cand)
         return out
+
+    def search_topics_by_doc(
+        self,
+        terms_by_doc: Dict[str, List[Tuple[str, float]]],
+        top_k: int,
+        index,
+        labels: List[str],
+    ) -> Dict[str, List[List[Tuple[str, float]]]]:
+        # Flatten every document's terms into one batch so encode + FAISS search run once for the corpus
+        flat_terms: List[str] = []
+        offsets: List[Tuple[str, int, int]] = []
+        for doc, terms in terms_by_doc.items():
+            start = len(flat_terms)
+            flat_terms.extend(t for t, _ in terms)
+            offsets.append((doc, start, len(flat_terms)))
+
+        flat_results = self.search_topics(flat_terms, top_k, index, labels)
+        return {doc: flat_results[start:end] for doc, start, end in offsets}
@@ -1,6 +1,11 @@
 import os
+import re
+import asyncio
+import hashlib
+import sqlite3
+import numpy as np
 from langchain_community.document_loaders import DirectoryLoader, PyPDFLoader
-from langchain.text_splitter import CharacterTextSplitter
+from langchain_core.documents import Document
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_neo4j import Neo4jGraph
 from dotenv import load_dotenv
@@ -10,6 +15,7 @@ load_dotenv()
 
 # Configuration
 DOCS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "pdfs")
+EMBED_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "embedding_cache.sqlite")
 NEO4J_URI = os.getenv("NEO4J_URI", "neo4j://localhost:7687")
 NEO4J_USERNAME = os.getenv("NEO4J_USERNAME", "neo4j")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
@@ -19,6 +25,10 @@ EMBEDDING_MODEL = "models/embedding-001"
 VECTOR_DIMENSIONS = 768  # Gemini-embedding-001 uses 768 dimensions
 CHUNK_SIZE = 1500
 CHUNK_OVERLAP = 200
+EMBED_BATCH_SIZE = 100
+EMBED_CONCURRENCY = 8
+WRITE_BATCH_SIZE = 500
+LOAD_MAX_WORKERS = 8
 
 # Initialize Neo4j connection
 graph = Neo4jGraph(
@@ -34,21 +44,124 @@ embedding_provider = GoogleGenerativeAIEmbeddings(
     google_api_key=GEMINI_API_KEY
 )
 
-# Initialize text splitter
-text_splitter = CharacterTextSplitter(
-    separator="\n\n",
-    chunk_size=CHUNK_SIZE,
-    chunk_overlap=CHUNK_OVERLAP,
-)
+# Text splitting: blank-line separated pieces packed into CHUNK_SIZE windows with CHUNK_OVERLAP
+CHUNK_SEPARATOR = "\n\n"
+_CHUNK_SEPARATOR_RE = re.compile(re.escape(CHUNK_SEPARATOR))
+
+def split_text(text: str) -> list:
+    """Same packing as CharacterTextSplitter(separator="\\n\\n"), with a precompiled split."""
+    pieces = [p for p in _CHUNK_SEPARATOR_RE.split(text) if p]
+    sep_len = len(CHUNK_SEPARATOR)
+    chunks, window, total = [], [], 0
+    for piece in pieces:
+        extra = len(piece) + (sep_len if window else 0)
+        if window and total + extra > CHUNK_SIZE:
+            chunk = CHUNK_SEPARATOR.join(window).strip()
+            if chunk:
+                chunks.append(chunk)
+            # Drop pieces from the front until only the overlap remains and the next piece fits
+            start = 0
+            while start < len(window) and (
+                total > CHUNK_OVERLAP or (total + len(piece) + sep_len > CHUNK_SIZE and total > 0)
+            ):
+                total -= len(window[start]) + (sep_len if len(window) - start > 1 else 0)
+                start += 1
+            window = window[start:]
+            extra = len(piece) + (sep_len if window else 0)
+        window.append(piece)
+        total += extra
+    chunk = CHUNK_SEPARATOR.join(window).strip()
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+def split_documents(docs: list) -> list:
+    return [
+        Document(page_content=chunk, metadata=dict(doc.metadata))
+        for doc in docs
+        for chunk in split_text(doc.page_content)
+    ]
+
+def _content_hash(text: str) -> str:
+    return hashlib.sha256(f"{EMBEDDING_MODEL}\n{text}".encode("utf-8")).hexdigest()
+
+def embed_texts(texts: list) -> list:
+    """Embed texts, reusing vectors from the on-disk cache for unchanged content."""
+    hashes = [_content_hash(t) for t in texts]
+    os.makedirs(os.path.dirname(EMBED_CACHE_PATH), exist_ok=True)
+    with sqlite3.connect(EMBED_CACHE_PATH) as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS embeddings (hash TEXT PRIMARY KEY, vec BLOB)")
+        cached = {}
+        unique_hashes = list(dict.fromkeys(hashes))
+        for i in range(0, len(unique_hashes), 500):
+            part = unique_hashes[i:i + 500]
+            placeholders = ",".join("?" * len(part))
+            for h, blob in conn.execute(f"SELECT hash, vec FROM embeddings WHERE hash IN ({placeholders})", part):
+                cached[h] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+        # Embed cache misses in batches (one API round-trip per batch instead of per chunk)
+        misses = {}
+        for h, t in zip(hashes, texts):
+            if h not in cached:
+                misses.setdefault(h, t)
+        miss_hashes = list(misses)
+        print(f"Embedding cache: {len(texts) - sum(h in misses for h in hashes)} hits, {len(miss_hashes)} to embed")
+        batches = [miss_hashes[i:i + EMBED_BATCH_SIZE] for i in range(0, len(miss_hashes), EMBED_BATCH_SIZE)]
+        results = asyncio.run(_aembed_batches([[misses[h] for h in batch] for batch in batches]))
+        failed = 0
+        for batch, vectors in zip(batches, results):
+            if isinstance(vectors, Exception):
+                print(f"Embedding batch of {len(batch)} chunks failed: {vectors}")
+                failed += 1
+                continue
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (hash, vec) VALUES (?, ?)",
+                [(h, np.asarray(v, dtype=np.float32).tobytes()) for h, v in zip(batch, vectors)],
+            )
+            cached.update(zip(batch, vectors))
+        conn.commit()
+        if failed:
+            raise RuntimeError(f"{failed} of {len(batches)} embedding batches failed; successful batches were cached")
+
+    return [cached[h] for h in hashes]
+
+async def _aembed_batches(batches: list) -> list:
+    # Overlap the embedding API round-trips, bounded by EMBED_CONCURRENCY
+    sem = asyncio.Semaphore(EMBED_CONCURRENCY)
+
+    async def one(i: int, batch: list):
+        async with sem:
+            print(f"Embedding batch {i + 1}/{len(batches)} ({len(batch)} chunks)")
+            return await embedding_provider.aembed_documents(batch)
+
+    return await asyncio.gather(*(one(i, b) for i, b in enumerate(batches)), return_exceptions=True)
+
+def ensure_chunk_indexes():
+    graph.query("""
+        CREATE CONSTRAINT chunk_id_unique IF NOT EXISTS
+        FOR (c:Chunk) REQUIRE c.id IS UNIQUE
+    """)
+    # MERGE (p:Paper {title}) needs an index-backed lookup; titles may repeat, so a plain index
+    graph.query("""
+        CREATE INDEX paper_title_idx IF NOT EXISTS
+        FOR (p:Paper) ON (p.title)
+    """)
 
 def embed_and_store_papers():
     try:
         # Load and split documents
-        loader = DirectoryLoader(DOCS_PATH, glob="**/*.pdf", loader_cls=PyPDFLoader)
+        loader = DirectoryLoader(
+            DOCS_PATH, glob="**/*.pdf", loader_cls=PyPDFLoader,
+            use_multithreading=True, max_concurrency=LOAD_MAX_WORKERS,
+        )
         docs = loader.load()
-        chunks = text_splitter.split_documents(docs)
+        chunks = split_documents(docs)
+
+        texts = [chunk.page_content for chunk in chunks]
+        embeddings = embed_texts(texts)
 
-        for chunk in chunks:
+        rows = []
+        for chunk, chunk_embedding in zip(chunks, embeddings):
             filename = os.path.basename(chunk.metadata["source"])
             chunk_id = f"{filename}.{chunk.metadata['page']}"
             print(f"Processing - {chunk_id}")
@@ -56,40 +169,55 @@ def embed_and_store_papers():
             # Get title from metadata (if available)
             title = chunk.metadata.get("title", filename).strip().lower()
 
-            # Embed the chunk
-            chunk_embedding = embedding_provider.embed_query(chunk.page_content)
-
-            # Store chunk and link to Paper node
-            properties = {
+            rows.append({
                 "filename": filename,
                 "chunk_id": chunk_id,
                 "text": chunk.page_content,
                 "embedding": chunk_embedding,
                 "title": title
-            }
+            })
 
+        ensure_chunk_indexes()
+
+        # Store chunks and link to Paper nodes, one UNWIND per batch of rows
+        for i in range(0, len(rows), WRITE_BATCH_SIZE):
             graph.query("""
-                MERGE (p:Paper {title: $title})
-                MERGE (c:Chunk {id: $chunk_id})
-                SET c.text = $text, c.filename = $filename
+                UNWIND $rows AS row
+                MERGE (p:Paper {title: row.title})
+                MERGE (c:Chunk {id: row.chunk_id})
+                SET c.text = row.text, c.filename = row.filename
                 MERGE (p)<-[:PART_OF]-(c)
-                WITH c
-                CALL db.create.setNodeVectorProperty(c, 'textEmbedding', $embedding)
-            """, properties)
+                WITH c, row
+                CALL db.create.setNodeVectorProperty(c, 'textEmbedding', row.embedding)
+            """, {"rows": rows[i:i + WRITE_BATCH_SIZE]})
+        print(f"Stored {len(rows)} chunks.")
 
         # Drop existing vector index (to fix dimension mismatch)
         graph.query("DROP INDEX chunkVector IF EXISTS")
 
-        # Create new vector index
-        graph.query("""
-            CREATE VECTOR INDEX chunkVector
-            IF NOT EXISTS
-            FOR (c:Chunk) ON (c.textEmbedding)
-            OPTIONS {indexConfig: {
-                `vector.dimensions`: $vector_dimensions,
-                `vector.similarity_function`: 'cosine'
-            }}
-        """, {"vector_dimensions": VECTOR_DIMENSIONS})
+        # Create new vector index (int8-quantized where the Neo4j version supports it)
+        try:
+            graph.query("""
+                CREATE VECTOR INDEX chunkVector
+                IF NOT EXISTS
+                FOR (c:Chunk) ON (c.textEmbedding)
+                OPTIONS {indexConfig: {
+                    `vector.dimensions`: $vector_dimensions,
+                    `vector.similarity_function`: 'cosine',
+                    `vector.quantization.enabled`: true
+                }}
+            """, {"vector_dimensions": VECTOR_DIMENSIONS})
+        except Exception as e:
+            print(f"Vector quantization not supported ({e}); creating unquantized index.")
+            graph.query("""
+                CREATE VECTOR INDEX chunkVector
+                IF NOT EXISTS
+                FOR (c:Chunk) ON (c.textEmbedding)
+                OPTIONS {indexConfig: {
+                    `vector.dimensions`: $vector_dimensions,
+                    `vector.similarity_function`: 'cosine'
+                }}
+            """, {"vector_dimensions": VECTOR_DIMENSIONS})
 
         print("Embedding and storage completed successfully.")
     except Exception as e:
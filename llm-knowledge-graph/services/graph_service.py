@@ -1,11 +1,104 @@
 from langchain_neo4j import Neo4jGraph
+import os
+import time
 import uuid
 
+# Bumped whenever HAS_TOPIC links are written so readers can tell cached transactions are stale
+TOPIC_LINK_VERSION_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "topic_links.version")
+
 class GraphService:
     def __init__(self, url, username, password):
+        # Papers are merged by id here; the Chunk.id constraint and Paper.title index used by the
+        # embedding pipeline are created in embedding_service.ensure_chunk_indexes()
         self.graph = Neo4jGraph(url=url, username=username, password=password)
+        self._constraints_ready = False
+        self._topic_index_ready = False
         print("GraphService connected to Neo4j.")
 
+    def _ensure_constraints(self):
+        if self._constraints_ready:
+            return
+        for name, label in (("author_id_unique", "Author"),
+                            ("reference_id_unique", "Reference"),
+                            ("journal_id_unique", "Journal")):
+            try:
+                self.graph.query(
+                    f"CREATE CONSTRAINT {name} IF NOT EXISTS FOR (n:{label}) REQUIRE n.id IS UNIQUE"
+                )
+            except Exception as e:
+                print(f"  > Warning: could not ensure {label}.id constraint: {e}")
+        self._constraints_ready = True
+
+    def _ensure_topic_label_index(self):
+        # Same name as CSOService.ensure_constraints so either side can create it first
+        if self._topic_index_ready:
+            return
+        try:
+            self.graph.query("CREATE INDEX topic_label_idx IF NOT EXISTS FOR (t:Topic) ON (t.label)")
+        except Exception as e:
+            print(f"  > Warning: could not ensure Topic.label index: {e}")
+        self._topic_index_ready = True
+
+    def upsert_topic_links(self, filename: str, topics: list) -> tuple:
+        """MERGE HAS_TOPIC from every Paper with `filename` to the existing Topic nodes in one UNWIND; returns (linked, missing)."""
+        topics = sorted({t for t in topics if isinstance(t, str) and t.strip()})
+        if not topics:
+            return [], []
+        self._ensure_topic_label_index()
+        # Topic nodes come from the CSO import (keyed by label_norm), so they are matched here, never created
+        # OPTIONAL MATCH on both sides: "missing" means no Topic node, not "no Paper to link from"
+        rows = self.graph.query(
+            """
+            OPTIONAL MATCH (p:Paper {filename: $filename})
+            WITH collect(p) AS papers
+            UNWIND $topics AS topic_label
+            OPTIONAL MATCH (t:Topic {label: topic_label})
+            FOREACH (p IN CASE WHEN t IS NULL THEN [] ELSE papers END | MERGE (p)-[:HAS_TOPIC]->(t))
+            RETURN topic_label, t IS NOT NULL AS exists, size(papers) > 0 AS has_paper
+            """,
+            {"filename": filename, "topics": topics}
+        )
+        if rows and not rows[0]["has_paper"]:
+            print(f"  > Warning: no Paper with filename '{filename}'; nothing linked.")
+        linked = sorted({r["topic_label"] for r in rows if r["exists"] and r["has_paper"]})
+        missing = sorted({r["topic_label"] for r in rows if not r["exists"]})
+        if linked:
+            self.bump_topic_link_version()
+        return linked, missing
+
+    def bump_topic_link_version(self):
+        try:
+            os.makedirs(os.path.dirname(TOPIC_LINK_VERSION_PATH), exist_ok=True)
+            with open(TOPIC_LINK_VERSION_PATH, "w", encoding="utf-8") as f:
+                f.write(str(time.time_ns()))
+        except OSError as e:
+            print(f"  > Warning: could not bump topic link version: {e}")
+
+    def topic_link_version(self) -> str:
+        try:
+            with open(TOPIC_LINK_VERSION_PATH, encoding="utf-8") as f:
+                return f.read().strip()
+        except OSError:
+            return "0"
+
+    def write_many(self, statements):
+        """Runs (cypher, params) pairs in one write transaction on a single driver session."""
+        statements = [(q, p or {}) for q, p in statements if q]
+        if not statements:
+            return
+        driver = getattr(self.graph, "_driver", None)
+        if driver is None:
+            for q, p in statements:
+                self.graph.query(q, p)
+            return
+
+        def _work(tx):
+            for q, p in statements:
+                tx.run(q, p).consume()
+
+        with driver.session(database=getattr(self.graph, "_database", None)) as session:
+            session.execute_write(_work)
+
     def import_paper_graph(self, paper_data: dict, filename: str):
         paper_uuid = str(uuid.uuid4())
         venue = paper_data.get('venue')
@@ -14,7 +107,8 @@ class GraphService:
         if not isinstance(venue, str):
             venue = str(venue) if venue else "Unknown Journal or Conference"
 
-        import_query = """
+        # Written as four small UNWIND queries instead of one large transaction
+        paper_query = """
         MERGE (p:Paper {id: $uuid})
         SET p.title = coalesce($paper.title, 'Untitled Paper'),
             p.abstract = coalesce($paper.abstract, 'No abstract provided'),
@@ -29,30 +123,51 @@ class GraphService:
             ON CREATE SET j.name = venueName
             MERGE (p)-[:PUBLISHED_IN]->(j)
         )
+        """
 
-        WITH p
-        UNWIND $paper.authors AS author_data
-        MERGE (a:Author {id: coalesce(author_data.email, author_data.name)})
+        author_query = """
+        MATCH (p:Paper {id: $uuid})
+        UNWIND $rows AS author_data
+        MERGE (a:Author {id: author_data.id})
         ON CREATE SET a.name = author_data.name, a.email = author_data.email
         MERGE (a)-[:AUTHORED]->(p)
-        WITH p, collect(a) AS authors 
+        """
 
-        WITH p, authors 
-        UNWIND $paper.references AS ref_data
-        WITH p, authors, ref_data
-        WHERE ref_data.title IS NOT NULL
-        MERGE (r:Reference {id: coalesce(ref_data.doi, ref_data.title)})
+        reference_query = """
+        MATCH (p:Paper {id: $uuid})
+        UNWIND $rows AS ref_data
+        MERGE (r:Reference {id: ref_data.id})
         ON CREATE SET r.title = ref_data.title, r.doi = ref_data.doi
         MERGE (p)-[:CITES]->(r)
+        """
 
-        WITH authors
-        UNWIND authors AS a1
-        UNWIND authors AS a2
-        WITH a1, a2
-        WHERE a1.id < a2.id
-        MERGE (a1)-[:CO_AUTHOR]-(a2)
+        # Co-author pairs computed here instead of a Cypher self-join; direction is lower id -> higher id
+        co_author_query = """
+        UNWIND $rows AS pair
+        MATCH (a:Author {id: pair.a})
+        MATCH (b:Author {id: pair.b})
+        MERGE (a)-[:CO_AUTHOR]->(b)
         """
-        
+
+        author_rows = []
+        for a in paper_data.get('authors', []) or []:
+            if not isinstance(a, dict):
+                continue
+            author_id = a.get('email') if a.get('email') is not None else a.get('name')
+            if author_id is None:
+                continue
+            author_rows.append({"id": author_id, "name": a.get('name'), "email": a.get('email')})
+
+        reference_rows = [
+            {"id": r.get('doi') if r.get('doi') is not None else r.get('title'),
+             "title": r.get('title'), "doi": r.get('doi')}
+            for r in paper_data.get('references', []) or []
+            if isinstance(r, dict) and r.get('title') is not None
+        ]
+
+        author_ids = sorted({row["id"] for row in author_rows})
+        pairs = [{"a": x, "b": y} for i, x in enumerate(author_ids) for y in author_ids[i + 1:]]
+
         params = {
             "uuid": paper_uuid,
             "filename": filename,
@@ -62,13 +177,19 @@ class GraphService:
                 "publisher": paper_data.get('publisher', None),
                 "venue": venue,
                 "publication_date": paper_data.get('publication_date', None),
-                "authors": paper_data.get('authors', []),
-                "references": paper_data.get('references', []),
                 "topics": paper_data.get('topics', [])
             }
         }
         try:
-            self.graph.query(import_query, params)
+            self._ensure_constraints()
+            statements = [(paper_query, params)]
+            if author_rows:
+                statements.append((author_query, {"uuid": paper_uuid, "rows": author_rows}))
+            if reference_rows:
+                statements.append((reference_query, {"uuid": paper_uuid, "rows": reference_rows}))
+            if pairs:
+                statements.append((co_author_query, {"rows": pairs}))
+            self.write_many(statements)
             print(f"  > Successfully imported graph for paper: {filename} with UUID: {paper_uuid}")
             return paper_uuid
         except Exception as e:
@@ -82,31 +203,27 @@ class GraphService:
             return
         
         try:
-            existing_topics = self.graph.query(
+            # Filter to existing topics and link them in a single round trip (Topic.label is indexed by CSOService)
+            result = self.graph.query(
                 """
-                MATCH (t:Topic)
-                WHERE t.label IN $labels
-                RETURN t.label AS label
+                MATCH (p:Paper {id: $uuid})
+                UNWIND $labels AS topic_label
+                MATCH (t:Topic {label: topic_label})
+                WITH p, collect(t) AS ts
+                SET p.topics = [t IN ts | t.label]
+                FOREACH (t IN ts | MERGE (p)-[:HAS_TOPIC]->(t))
+                RETURN [t IN ts | t.label] AS found
                 """,
-                {"labels": topic_labels}
+                {"uuid": paper_uuid, "labels": topic_labels}
             )
-            existing_labels = [record['label'] for record in existing_topics]
+            existing_labels = result[0]["found"] if result else []
+            if existing_labels:
+                self.bump_topic_link_version()
             print(f"  > Found {len(existing_labels)} existing topics in Neo4j: {existing_labels}")
 
             if existing_labels:
-                self.graph.query(
-                    """
-                    MATCH (p:Paper {id: $uuid})
-                    SET p.topics = $labels
-                    WITH p
-                    UNWIND $labels AS topic_label
-                    MATCH (t:Topic {label: topic_label})
-                    MERGE (p)-[:HAS_TOPIC]->(t)
-                    """,
-                    {"uuid": paper_uuid, "labels": existing_labels}
-                )
                 print(f"  > Linked paper with UUID {paper_uuid} to {len(existing_labels)} topics and updated topics property: {existing_labels}")
             else:
                 print(f"  > No matching topics found in Neo4j for paper with UUID {paper_uuid}.")
         except Exception as e:
-            print(f"  > Failed to link topics for paper with UUID {paper_uuid}. Error: {e}")
\ No newline at end of file
+            print(f"  > Failed to link topics for paper with UUID {paper_uuid}. Error: {e}")
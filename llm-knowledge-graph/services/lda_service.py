@@ -1,19 +1,11 @@
 from __future__ import annotations
 from typing import Dict, Any, List, Tuple
-import re
 import numpy as np
 from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.decomposition import LatentDirichletAllocation
+from services.text_utils import clean_text as _clean_text, hashed_term_matrix, top_k_indices as _top_k_indices
 
 
-def _clean_text(text: str) -> str:
-    if not isinstance(text, str):
-        return ""
-    text = re.sub(r"ISSN:?\s*\d{4}-\d{4}", " ", text, flags=re.I)
-    text = re.sub(r"https?://\S+|www\.\S+", " ", text)
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
-
 class LDAService:
     """
     LDA = Bag-of-Words -> LDA (sklearn).
@@ -31,6 +23,10 @@ class LDAService:
         ngram_range=(1, 2),
         min_df: int | float = 2,
         max_df: float = 0.9,
+        n_jobs: int | None = None,    # -1 = parallel E-step on all cores (worth it for large corpora)
+        use_hashing: bool = False,    # HashingVectorizer instead of CountVectorizer (no vocabulary in memory)
+        n_hash_features: int = 1 << 20,
+        vocab_sample_docs: int | None = 200,  # docs used to recover readable term names when hashing
     ):
         self.n_topics = n_topics
         self.n_top_terms_per_doc = n_top_terms_per_doc
@@ -40,6 +36,10 @@ class LDAService:
         self.ngram_range = ngram_range
         self.min_df = min_df
         self.max_df = max_df
+        self.n_jobs = n_jobs
+        self.use_hashing = use_hashing
+        self.n_hash_features = n_hash_features
+        self.vocab_sample_docs = vocab_sample_docs
 
     def run(self, pdf_texts: Dict[str, str]) -> Dict[str, Any]:
         # 1) Prepare documents
@@ -52,16 +52,30 @@ class LDAService:
         if not docs:
             return {"doc_terms": [], "topics": [], "n_docs": 0, "n_topics": 0}
 
-        # 2) CountVectorizer
-        vec = CountVectorizer(
-            stop_words=self.stopwords_lang,
-            max_features=self.max_features,
-            ngram_range=self.ngram_range,
-            min_df=self.min_df,
-            max_df=self.max_df,
-        )
-        X = vec.fit_transform(docs)
-        terms = vec.get_feature_names_out()
+        # 2) Bag-of-words counts
+        if self.use_hashing:
+            # constant-memory featurization for large corpora
+            X, terms = hashed_term_matrix(
+                docs,
+                stop_words=self.stopwords_lang,
+                ngram_range=self.ngram_range,
+                min_df=self.min_df,
+                max_df=self.max_df,
+                max_features=self.max_features,
+                n_features=self.n_hash_features,
+                vocab_sample_docs=self.vocab_sample_docs,
+            )
+        else:
+            vec = CountVectorizer(
+                stop_words=self.stopwords_lang,
+                max_features=self.max_features,
+                ngram_range=self.ngram_range,
+                min_df=self.min_df,
+                max_df=self.max_df,
+                dtype=np.float32,  # LDA works on float anyway; avoids an int64 -> float64 upcast copy
+            )
+            X = vec.fit_transform(docs).tocsr()
+            terms = vec.get_feature_names_out()
         if X.shape[1] == 0:
             return {"doc_terms": [], "topics": [], "n_docs": len(filenames), "n_topics": 0}
 
@@ -74,6 +88,7 @@ class LDAService:
             n_components=n_topics_eff,
             learning_method="batch",
             random_state=self.random_state,
+            n_jobs=self.n_jobs,
         )
         doc_topic = lda.fit_transform(X)  # θ_dk
         topic_term = lda.components_      # β_kv (unnormalized)
@@ -81,23 +96,24 @@ class LDAService:
         # 4) Normalize β per topic
         topic_term_norm = topic_term / (topic_term.sum(axis=1, keepdims=True) + 1e-12)
 
-        # 5) doc_terms from document topic mixture
-        doc_terms = []
+        # 5) doc_terms from document topic mixture (all documents in one matmul)
+        theta = doc_topic / (doc_topic.sum(axis=1, keepdims=True) + 1e-12)
+        doc_term_dist = theta @ topic_term_norm  # (n_docs, n_terms)
         top_k_doc = min(self.n_top_terms_per_doc, len(terms))
+        doc_idx = _top_k_indices(doc_term_dist, top_k_doc)
+        doc_terms = []
         for i, fn in enumerate(filenames):
-            theta = doc_topic[i]
-            theta = theta / (theta.sum() + 1e-12)
-            doc_term_dist = theta @ topic_term_norm  # (n_terms,)
-            idx = np.argsort(-doc_term_dist)[:top_k_doc]
-            terms_i = [(terms[j], float(doc_term_dist[j])) for j in idx]
+            row = doc_term_dist[i]
+            terms_i = [(terms[j], float(row[j])) for j in doc_idx[i]]
             doc_terms.append({"filename": fn, "model": "LDA", "terms": terms_i})
 
         # 6) Top words per topic
-        topics = []
         top_k_topic = min(self.n_top_terms_per_doc, len(terms))
+        topic_idx = _top_k_indices(topic_term_norm, top_k_topic)
+        topics = []
         for k in range(n_topics_eff):
             tt = topic_term_norm[k]
-            idx = np.argsort(-tt)[:top_k_topic]
+            idx = topic_idx[k]
             topics.append({
                 "topic_id": k,
                 "top_words": [terms[j] for j in idx],
@@ -1,20 +1,38 @@
 from typing import List, Dict, Any, Optional
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
+from services.llm_utils import FastJsonOutputParser
 from pydantic import BaseModel, Field
+from services.llm_cache import LLMResponseCache, make_cache_key, llm_model_name
 import re
 import json
+import hashlib
+import os
+import pickle
+from itertools import combinations
+from functools import lru_cache
 
+_PAREN_RE = re.compile(r"\s*\([^)]+\)\s*")
+_WS_RE = re.compile(r"\s+")
+
+@lru_cache(maxsize=20000)
 def _normalize_item(s: str) -> str:
     if not isinstance(s, str):
         return ""
-    s = re.sub(r"\s*\([^)]+\)\s*", " ", s)
-    s = re.sub(r"\s+", " ", s.strip())
+    s = _PAREN_RE.sub(" ", s)
+    s = _WS_RE.sub(" ", s.strip())
     return s.lower()
 
 def _canonicalize_items(items: List[str]) -> List[str]:
     return sorted({_normalize_item(i) for i in items if isinstance(i, str) and i.strip()})
 
+def _items_key(items: List[str]) -> str:
+    # Canonical items are sorted, so the key is stable across runs
+    return hashlib.sha1("|".join(items).encode("utf-8")).hexdigest()
+
+TOPIC_SET_LABELS = ("FrequentTopicSet", "LeftTopicSet", "RightTopicSet")
+APRIORI_CACHE_TTL = 7 * 24 * 3600
+TX_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "llm_apriori_tx.pkl")
+
 class FrequentItemset(BaseModel):
     items: List[str] = Field(description="Daftar topik (itemset) yang dinilai sering muncul bersama.")
     support_count: int = Field(description="Jumlah paper yang mengandung seluruh items.")
@@ -30,10 +48,85 @@ class LLMAprioriOutput(BaseModel):
     frequent_itemsets: List[FrequentItemset] = Field(description="Himpunan item-set yang dianggap sering.")
     rules: List[AssociationRule] = Field(description="Aturan asosiasi (A -> B) yang relevan.")
 
+def _mine_apriori(transactions: List[Dict[str, Any]],
+                  min_support_count: int,
+                  min_confidence: float,
+                  max_itemset_size: int) -> LLMAprioriOutput:
+    """Exact level-wise Apriori over canonical topic transactions using tid-set intersections."""
+    total = len(transactions)
+    if total == 0:
+        return LLMAprioriOutput(frequent_itemsets=[], rules=[])
+    min_count = max(1, int(min_support_count))
+
+    item_tids: Dict[str, set] = {}
+    for idx, t in enumerate(transactions):
+        for item in t["topics"]:
+            item_tids.setdefault(item, set()).add(idx)
+
+    level = {(item,): tids for item, tids in item_tids.items() if len(tids) >= min_count}
+    support: Dict[tuple, int] = {k: len(v) for k, v in level.items()}
+    size = 1
+    while level and size < max_itemset_size:
+        size += 1
+        prev = sorted(level)
+        nxt = {}
+        for i, a in enumerate(prev):
+            for b in prev[i + 1:]:
+                if a[:-1] != b[:-1]:
+                    break
+                cand = a + (b[-1],)
+                # every (k-1)-subset must itself be frequent
+                if any(cand[:j] + cand[j + 1:] not in level for j in range(size - 2)):
+                    continue
+                tids = level[a] & level[b]
+                if len(tids) >= min_count:
+                    nxt[cand] = tids
+        level = nxt
+        support.update((k, len(v)) for k, v in level.items())
+
+    itemsets = [
+        FrequentItemset(items=list(k), support_count=c, support=c / total)
+        for k, c in sorted(support.items(), key=lambda kv: (len(kv[0]), kv[0]))
+    ]
+
+    rules = []
+    for items, count in support.items():
+        n = len(items)
+        if n < 2:
+            continue
+        for r in range(1, n):
+            for lhs in combinations(items, r):
+                confidence = count / support[lhs]
+                if confidence < min_confidence:
+                    continue
+                rhs = [x for x in items if x not in lhs]
+                rules.append(AssociationRule(
+                    antecedent=list(lhs), consequent=rhs,
+                    support=count / total, confidence=confidence
+                ))
+    rules.sort(key=lambda r: (-r.confidence, -r.support, r.antecedent, r.consequent))
+    return LLMAprioriOutput(frequent_itemsets=itemsets, rules=rules)
+
+def _candidate_splits(items: List[str]):
+    """Yield every (antecedent, consequent) split of items, smallest antecedents first."""
+    idx = range(len(items))
+    for r in range(1, len(items)):
+        for picked in combinations(idx, r):
+            chosen = set(picked)
+            yield [items[i] for i in picked], [items[i] for i in idx if i not in chosen]
+
 class LLMAprioriService:
-    def __init__(self, llm, graph_service):
+    def __init__(self, llm, graph_service, use_cache: bool = True, cache_ttl: Optional[int] = APRIORI_CACHE_TTL,
+                 use_llm: bool = False, verbose: bool = True, max_rules_to_print: Optional[int] = 200):
         self.llm = llm
         self.graph_service = graph_service
+        # Itemsets/rules are mined exactly in Python unless use_llm is set
+        self.use_llm = use_llm
+        self.verbose = verbose
+        self.max_rules_to_print = max_rules_to_print
+        self.cache = LLMResponseCache(ttl=cache_ttl) if use_cache else None
+        self._tx_cache_fp = None
+        self._tx_cache = None
 
         self.prompt = ChatPromptTemplate.from_messages([
             ("system",
@@ -62,10 +155,52 @@ class LLMAprioriService:
             }}
             """)
         ])
-        self.parser = JsonOutputParser(pydantic_object=LLMAprioriOutput)
+        self.parser = FastJsonOutputParser(pydantic_object=LLMAprioriOutput)
         self.chain = self.prompt | self.llm | self.parser
+        self._constraints_ready = False
+
+    def _ensure_topic_set_constraints(self):
+        if self._constraints_ready:
+            return
+        for label in TOPIC_SET_LABELS:
+            try:
+                # Backfill keys on sets written before the key existed, then enforce uniqueness
+                self.graph_service.graph.query(f"""
+                MATCH (n:{label}) WHERE n.key IS NULL AND n.items IS NOT NULL
+                SET n.key = apoc.util.sha1([apoc.text.join(n.items, '|')])
+                """)
+                self.graph_service.graph.query(
+                    f"CREATE CONSTRAINT {label.lower()}_key_unique IF NOT EXISTS "
+                    f"FOR (n:{label}) REQUIRE n.key IS UNIQUE"
+                )
+            except Exception as e:
+                print(f"  > Warning: could not ensure {label}.key constraint: {e}")
+        self._constraints_ready = True
+
+    def _topic_graph_fingerprint(self) -> Optional[str]:
+        try:
+            rows = self.graph_service.graph.query("""
+            MATCH ()-[r:HAS_TOPIC]->() RETURN count(r) AS links
+            """)
+            links = rows[0]["links"] if rows else 0
+        except Exception as e:
+            print(f"  > Could not fingerprint topic graph: {e}")
+            return None
+        return f"{links}:{self.graph_service.topic_link_version()}"
 
     def _fetch_transactions(self) -> List[Dict[str, Any]]:
+        fp = self._topic_graph_fingerprint()
+        if fp is not None:
+            if self._tx_cache_fp is None and os.path.exists(TX_CACHE_PATH):
+                try:
+                    with open(TX_CACHE_PATH, "rb") as f:
+                        self._tx_cache_fp, self._tx_cache = pickle.load(f)
+                except Exception:
+                    self._tx_cache_fp, self._tx_cache = None, None
+            if self._tx_cache_fp == fp and self._tx_cache is not None:
+                print(f"  > Loaded {len(self._tx_cache)} transactions from cache.")
+                return self._tx_cache
+
         query = """
         MATCH (p:Paper)-[:HAS_TOPIC]->(t:Topic)
         RETURN p.id AS id, collect(DISTINCT t.label) AS topics
@@ -78,14 +213,50 @@ class LLMAprioriService:
             if topics:
                 tx.append({"paper_id": r["id"], "topics": topics})
         print(f"  > Loaded {len(tx)} transactions from Neo4j.")
+
+        if fp is not None:
+            self._tx_cache_fp, self._tx_cache = fp, tx
+            try:
+                os.makedirs(os.path.dirname(TX_CACHE_PATH), exist_ok=True)
+                with open(TX_CACHE_PATH, "wb") as f:
+                    pickle.dump((fp, tx), f)
+            except OSError as e:
+                print(f"  > Warning: could not write transaction cache: {e}")
         return tx
     
+    def _run_python_apriori(self,
+                            transactions: List[Dict[str, Any]],
+                            min_support_count: int,
+                            min_confidence: float,
+                            max_itemset_size: int) -> LLMAprioriOutput:
+        print("  > Mining frequent itemsets and rules in Python...")
+        return _mine_apriori(transactions, min_support_count, min_confidence, max_itemset_size)
+
     def _run_llm_apriori(self,
                          transactions: List[Dict[str, Any]],
                          min_support_count: int,
                          min_confidence: float,
                          max_itemset_size: int) -> LLMAprioriOutput:
         total_papers = len(transactions)
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = make_cache_key(
+                "llm_apriori",
+                llm_model_name(self.llm),
+                [m.prompt.template for m in self.prompt.messages],
+                sorted(transactions, key=lambda t: str(t["paper_id"])),
+                [min_support_count, min_confidence, max_itemset_size],
+            )
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                try:
+                    output = LLMAprioriOutput.model_validate(cached)
+                    print("  > Using cached LLM Apriori result.")
+                    return output
+                except Exception:
+                    pass
+
         print("  > Sending transactions to LLM for Apriori-like mining...")
 
         raw = self.chain.invoke({
@@ -99,16 +270,21 @@ class LLMAprioriService:
         # Normalisasi output ke Pydantic model
         try:
             if isinstance(raw, LLMAprioriOutput):
-                return raw
-            if isinstance(raw, str):
-                raw = json.loads(raw)
-            if isinstance(raw, dict):
-                return LLMAprioriOutput.model_validate(raw)
-            raise TypeError(f"Unexpected LLM output type: {type(raw)}")
+                output = raw
+            else:
+                if isinstance(raw, str):
+                    raw = json.loads(raw)
+                if not isinstance(raw, dict):
+                    raise TypeError(f"Unexpected LLM output type: {type(raw)}")
+                output = LLMAprioriOutput.model_validate(raw)
         except Exception as e:
             print(f"  > Failed to parse LLM output into LLMAprioriOutput: {e}")
             raise
 
+        if cache_key is not None:
+            self.cache.set(cache_key, output.model_dump())
+        return output
+
     def _print_step2_frequent_itemsets(self, itemsets: List[FrequentItemset]):
         if not itemsets:
             print("[Step2] No frequent itemsets.")
@@ -120,7 +296,8 @@ class LLMAprioriService:
         for it in data:
             print(f"[Step2] itemset={it.items}, paperCount={it.support_count}, length={len(it.items)}")
 
-    def _print_step3_candidate_rules(self, itemsets: List[FrequentItemset], min_support_count: int = 2):
+    def _print_step3_candidate_rules(self, itemsets: List[FrequentItemset], min_support_count: int = 2,
+                                     max_rules: Optional[int] = None):
         filt = [it for it in itemsets if it.support_count >= min_support_count]
         if not filt:
             print(f"[Step3] No itemsets with support_count >= {min_support_count}.")
@@ -133,43 +310,40 @@ class LLMAprioriService:
             return
 
         # generate semua subset A -> B untuk tiap base itemset terbesar
-        from itertools import combinations
+        lines = []
         for it in max_sets:
-            items = it.items
-            for r in range(1, len(items)):
-                for A in combinations(items, r):
-                    A = list(A)
-                    B = [x for x in items if x not in A]
-                    if not B:
-                        continue
-                    print(f"[Step3] base_itemset={items}, antecedent={A}, consequent={B}")
-
-    def _persist_frequent_itemsets(self, itemsets: List[FrequentItemset]):
+            for A, B in _candidate_splits(it.items):
+                if max_rules is not None and len(lines) >= max_rules:
+                    break
+                lines.append(f"[Step3] base_itemset={it.items}, antecedent={A}, consequent={B}")
+        print("\n".join(lines))
+
+    def _frequent_itemsets_statement(self, itemsets: List[FrequentItemset]):
         payload = []
         for it in itemsets:
             items = _canonicalize_items(it.items)
             if not items:
                 continue
             payload.append({
+                "key": _items_key(items),
                 "items": items,
                 "support_count": int(it.support_count),
                 "support": float(it.support) if it.support is not None else None
             })
 
         if not payload:
-            print("  > No frequent itemsets to persist.")
-            return
+            return None
 
         cypher = """
         UNWIND $itemsets AS row
-        MERGE (f:FrequentTopicSet {items: row.items})
+        MERGE (f:FrequentTopicSet {key: row.key})
+        ON CREATE SET f.items = row.items
         SET f.support_count = row.support_count,
             f.support = coalesce(row.support, f.support)
         """
-        self.graph_service.graph.query(cypher, {"itemsets": payload})
-        print(f"  > Persisted {len(payload)} FrequentTopicSet nodes.")
+        return cypher, {"itemsets": payload}
 
-    def _persist_rules(self, rules: List[AssociationRule]):
+    def _rules_statement(self, rules: List[AssociationRule]):
         payload = []
         for r in rules:
             lhs = _canonicalize_items(r.antecedent)
@@ -178,24 +352,42 @@ class LLMAprioriService:
                 continue
             payload.append({
                 "lhs": lhs, "rhs": rhs,
+                "lhs_key": _items_key(lhs), "rhs_key": _items_key(rhs),
                 "support": float(r.support),
                 "confidence": float(r.confidence)
             })
 
         if not payload:
-            print("  > No association rules to persist.")
-            return
+            return None
 
         cypher = """
         UNWIND $rules AS row
-        MERGE (l:LeftTopicSet {items: row.lhs})
-        MERGE (r:RightTopicSet {items: row.rhs})
+        MERGE (l:LeftTopicSet {key: row.lhs_key})
+        ON CREATE SET l.items = row.lhs
+        MERGE (r:RightTopicSet {key: row.rhs_key})
+        ON CREATE SET r.items = row.rhs
         MERGE (l)-[rel:RULES]->(r)
         SET rel.support = row.support,
             rel.confidence = row.confidence
         """
-        self.graph_service.graph.query(cypher, {"rules": payload})
-        print(f"  > Persisted {len(payload)} rules (LeftTopicSet)-[:RULES]->(RightTopicSet).")
+        return cypher, {"rules": payload}
+
+    def _persist_results(self, itemsets: List[FrequentItemset], rules: List[AssociationRule]):
+        # Both UNWIND writes go through one driver session / transaction
+        itemset_stmt = self._frequent_itemsets_statement(itemsets)
+        rule_stmt = self._rules_statement(rules)
+        if itemset_stmt or rule_stmt:
+            self._ensure_topic_set_constraints()
+        self.graph_service.write_many([s for s in (itemset_stmt, rule_stmt) if s])
+
+        if itemset_stmt:
+            print(f"  > Persisted {len(itemset_stmt[1]['itemsets'])} FrequentTopicSet nodes.")
+        else:
+            print("  > No frequent itemsets to persist.")
+        if rule_stmt:
+            print(f"  > Persisted {len(rule_stmt[1]['rules'])} rules (LeftTopicSet)-[:RULES]->(RightTopicSet).")
+        else:
+            print("  > No association rules to persist.")
 
     def build_llm_apriori_graph(self,
                                 min_support_count: int,
@@ -207,19 +399,21 @@ class LLMAprioriService:
                 print("  > No transactions available in the database.")
                 return {"transactions": 0, "itemsets": 0, "rules": 0}
 
-            output: LLMAprioriOutput = self._run_llm_apriori(
+            run = self._run_llm_apriori if self.use_llm else self._run_python_apriori
+            output: LLMAprioriOutput = run(
                 transactions=transactions,
                 min_support_count=min_support_count,
                 min_confidence=min_confidence,
                 max_itemset_size=max_itemset_size
             )
 
-            self._print_step2_frequent_itemsets(output.frequent_itemsets)
-            self._print_step3_candidate_rules(output.frequent_itemsets, min_support_count=min_support_count)
+            if self.verbose:
+                self._print_step2_frequent_itemsets(output.frequent_itemsets)
+                self._print_step3_candidate_rules(output.frequent_itemsets, min_support_count=min_support_count,
+                                                  max_rules=self.max_rules_to_print)
 
             # Persist hasil LLM
-            self._persist_frequent_itemsets(output.frequent_itemsets)
-            self._persist_rules(output.rules)
+            self._persist_results(output.frequent_itemsets, output.rules)
 
             summary = {
                 "transactions": len(transactions),
@@ -0,0 +1,55 @@
+from __future__ import annotations
+import os
+import json
+import time
+import hashlib
+import sqlite3
+from typing import Any, Optional
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "llm_cache.sqlite")
+
+
+def make_cache_key(*parts: Any) -> str:
+    """Stable sha256 over JSON-serialisable parts (dict keys sorted)."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def llm_model_name(llm: Any) -> Optional[str]:
+    return getattr(llm, "model", None) or getattr(llm, "model_name", None)
+
+
+class LLMResponseCache:
+    """Small sqlite key/value store for parsed LLM responses, with an optional TTL in seconds."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: Optional[int] = None):
+        self.path = path
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, ts INTEGER)")
+
+    def get(self, key: str) -> Optional[Any]:
+        with sqlite3.connect(self.path) as conn:
+            row = conn.execute("SELECT value, ts FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, ts = row
+        if self.ttl is not None and time.time() - ts > self.ttl:
+            return None
+        try:
+            return json.loads(value)
+        except (TypeError, ValueError):
+            return None
+
+    def delete(self, key: str) -> None:
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def set(self, key: str, value: Any) -> None:
+        blob = json.dumps(value, ensure_ascii=False, default=str)
+        with sqlite3.connect(self.path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, ts) VALUES (?, ?, ?)",
+                (key, blob, int(time.time())),
+            )
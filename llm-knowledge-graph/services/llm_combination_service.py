@@ -1,21 +1,38 @@
-from typing import List, Dict, Any, Optional, Tuple, Set
+from typing import List, Dict, Any, Optional, Tuple, Set, FrozenSet
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
+from services.llm_utils import FastJsonOutputParser
 from pydantic import BaseModel, Field
 import re
+from functools import lru_cache
 import json
+import itertools
+from services.log_utils import get_logger
 
+log = get_logger(__name__)
+
+_PAREN_RE = re.compile(r"\s*\([^)]+\)\s*")
+_WS_RE = re.compile(r"\s+")
+
+@lru_cache(maxsize=100_000)
 def _normalize_item(s: str) -> str:
     if not isinstance(s, str):
         return ""
-    s = re.sub(r"\s*\([^)]+\)\s*", " ", s)
-    s = re.sub(r"\s+", " ", s.strip())
+    s = _PAREN_RE.sub(" ", s)
+    s = _WS_RE.sub(" ", s.strip())
     return s.lower()
 
 def _canonicalize_items(items: List[str]) -> List[str]:
     return sorted({_normalize_item(i) for i in items if isinstance(i, str) and i.strip()})
 
 
+def _all_combinations(topics: List[str], max_k: int) -> List[List[str]]:
+    """All combinations of size 1..max_k of already-canonical topics, in sorted order."""
+    return sorted(list(c) for r in range(1, max_k + 1) for c in itertools.combinations(topics, r))
+
+
+COMBO_WRITE_BATCH = 10000
+
+
 class ComboResult(BaseModel):
     paper_id: str = Field(description="ID paper yang diproses.")
     combos: List[List[str]] = Field(description="Daftar kombinasi (1..max_k) dari topik paper tersebut.")
@@ -23,9 +40,12 @@ class ComboResult(BaseModel):
 
 class LLMCombinationService:
 
-    def __init__(self, llm, graph_service):
+    def __init__(self, llm, graph_service, use_llm: bool = False):
         self.llm = llm
         self.graph_service = graph_service
+        # Combinations are enumerated with itertools; the LLM chain is kept only for debugging
+        self.use_llm = use_llm
+        self._constraint_ready = False
 
         self.combo_prompt = ChatPromptTemplate.from_messages([
             ("system",
@@ -48,18 +68,18 @@ class LLMCombinationService:
             """)
         ])
 
-        self.combo_parser = JsonOutputParser(pydantic_object=ComboResult)
+        self.combo_parser = FastJsonOutputParser(pydantic_object=ComboResult)
         self.combo_chain = self.combo_prompt | self.llm | self.combo_parser
 
     def _fetch_topics_for_paper(self, paper_id: str) -> List[str]:
         rows = self.graph_service.graph.query(
             """
             MATCH (p:Paper {id: $pid})-[:HAS_TOPIC]->(t:Topic)
-            RETURN collect(DISTINCT t.label) AS topics
+            RETURN DISTINCT t.label AS label
             """,
             {"pid": paper_id}
         )
-        topics = rows[0]["topics"] if rows else []
+        topics = [r["label"] for r in rows]
         return _canonicalize_items([t for t in topics if isinstance(t, str)])
 
     def _validate_and_canonicalize_combos(
@@ -69,7 +89,7 @@ class LLMCombinationService:
         combos: List[List[str]],
         max_k: int
     ) -> List[List[str]]:
-        topic_set: Set[str] = set(topics)
+        topic_set: FrozenSet[str] = frozenset(topics)
         cleaned: Set[Tuple[str, ...]] = set()
 
         for combo in combos or []:
@@ -78,7 +98,7 @@ class LLMCombinationService:
             canon = _canonicalize_items(combo)
             if not canon:
                 continue
-            if not set(canon).issubset(topic_set):
+            if any(x not in topic_set for x in canon):
                 continue
             if len(canon) < 1 or len(canon) > max_k:
                 continue
@@ -86,43 +106,71 @@ class LLMCombinationService:
 
         return [list(t) for t in sorted(cleaned)]
 
-    def _persist_combos_for_paper(self, paper_id: str, combos: List[List[str]], topics: List[str]) -> None:
-        topic_count = len(topics)
-        combo_count = len(combos or [])
-        if not combos:
-            print(f"[Step1] paperId={paper_id}, topicCount={topic_count}, combinationCount={combo_count}\n"
-                f"         topics={topics}\n"
-                f"         combinations=[]")
+    def _print_combos_for_paper(self, paper_id: str, combos: List[List[str]], topics: List[str]) -> None:
+        log.info("[Step1] paperId=%s, topicCount=%d, combinationCount=%d\n"
+                 "         topics=%s\n"
+                 "         combinations=%s", paper_id, len(topics), len(combos or []), topics, combos or [])
+
+    def _ensure_combo_constraint(self) -> None:
+        if self._constraint_ready:
             return
+        try:
+            # Backfill the key on combinations written before it existed (items are stored sorted)
+            self.graph_service.graph.query("""
+            MATCH (c:TopicCombination) WHERE c.key IS NULL AND c.items IS NOT NULL
+            SET c.key = apoc.text.join(c.items, '|')
+            """)
+            self.graph_service.graph.query("""
+            CREATE CONSTRAINT topiccombo_key IF NOT EXISTS
+            FOR (c:TopicCombination) REQUIRE c.key IS UNIQUE
+            """)
+        except Exception as e:
+            log.warning("  > Warning: could not ensure TopicCombination.key constraint: %s", e)
+        self._constraint_ready = True
+
+    def _write_combo_rows(self, rows: List[Dict[str, Any]]) -> None:
+        """One UNWIND per COMBO_WRITE_BATCH (paper_id, combo) rows, merged on the combo key."""
+        self._ensure_combo_constraint()
+        rows = [{**row, "key": "|".join(sorted(row["combo"]))} for row in rows]
+        for i in range(0, len(rows), COMBO_WRITE_BATCH):
+            self.graph_service.graph.query(
+                """
+                UNWIND $rows AS row
+                MATCH (p:Paper {id: row.paper_id})
+                MERGE (c:TopicCombination {key: row.key})
+                ON CREATE SET c.items = row.combo
+                MERGE (p)-[:HAS_TOPIC_COMBINATION]->(c)
+                """,
+                {"rows": rows[i:i + COMBO_WRITE_BATCH]}
+            )
 
-        self.graph_service.graph.query(
-            """
-            UNWIND $rows AS row
-            MATCH (p:Paper {id: row.paper_id})
-            UNWIND row.combos AS combo
-            WITH p, combo
-            MERGE (c:TopicCombination {items: combo})
-            MERGE (p)-[:HAS_TOPIC_COMBINATION]->(c)
-            """,
-            {"rows": [{"paper_id": paper_id, "combos": combos}]}
-        )
-        print(f"[Step1] paperId={paper_id}, topicCount={topic_count}, combinationCount={combo_count}\n"
-            f"         topics={topics}\n"
-            f"         combinations={combos}")
+    def _persist_combos_for_paper(self, paper_id: str, combos: List[List[str]], topics: List[str]) -> None:
+        if combos:
+            self._write_combo_rows([{"paper_id": paper_id, "combo": c} for c in combos])
+        self._print_combos_for_paper(paper_id, combos, topics)
 
     def generate_combinations_for_paper(
         self,
         paper_id: str,
         max_k: Optional[int] = None,
-        repair_missing: bool = False  # kalau True, isi kekurangan (jika LLM miss) pakai kombinasi Python (opsional)
+        repair_missing: bool = False,  # kalau True, isi kekurangan (jika LLM miss) pakai kombinasi Python (opsional)
+        persist: bool = True
     ) -> Optional[List[List[str]]]:
         topics = self._fetch_topics_for_paper(paper_id)
         if not topics:
-            print(f"[Step1] paperId={paper_id}\n         combinations=[]  (No topics found)")
+            log.info("[Step1] paperId=%s\n         combinations=[]  (No topics found)", paper_id)
             return None
 
         k = min(len(topics), max_k) if max_k else len(topics)
 
+        if not self.use_llm:
+            combos = _all_combinations(topics, k)
+            if persist:
+                self._persist_combos_for_paper(paper_id, combos, topics)
+            else:
+                self._print_combos_for_paper(paper_id, combos, topics)
+            return combos
+
         #LLM
         raw = self.combo_chain.invoke({
             "paper_id": paper_id,
@@ -139,26 +187,25 @@ class LLMCombinationService:
                 data = json.loads(raw)
                 llm_combos = data.get("combos", [])
             except Exception:
-                print(f"  > Unexpected LLM output for {paper_id}: {type(raw)}")
+                log.warning("  > Unexpected LLM output for %s: %s", paper_id, type(raw))
                 return None
 
         # Validasi pasca-LLM
         combos = self._validate_and_canonicalize_combos(paper_id, topics, llm_combos, k)
 
         if repair_missing:
-            import itertools
-            full = set()
-            for r in range(1, k + 1):
-                for combo in itertools.combinations(topics, r):
-                    full.add(tuple(combo))
-            have = set(tuple(c) for c in combos)
-            missing = [list(c) for c in sorted(full - have)]
+            # validated combos are already a subset of the full enumeration, so the repaired set is just `full`
+            full = _all_combinations(topics, k)
+            missing = len(full) - len(combos)
             if missing:
-                print(f"  > LLM missed {len(missing)} combos; repairing due to repair_missing=True.")
-                combos = [list(c) for c in sorted(have | set(tuple(m) for m in missing))]
+                log.info("  > LLM missed %d combos; repairing due to repair_missing=True.", missing)
+                combos = full
 
         # Persist & print
-        self._persist_combos_for_paper(paper_id, combos, topics)
+        if persist:
+            self._persist_combos_for_paper(paper_id, combos, topics)
+        else:
+            self._print_combos_for_paper(paper_id, combos, topics)
         return combos
 
     def generate_combinations_for_papers(
@@ -169,6 +216,13 @@ class LLMCombinationService:
     ) -> Dict[str, List[List[str]]]:
         out: Dict[str, List[List[str]]] = {}
         for pid in sorted(set(paper_ids)):
-            combos = self.generate_combinations_for_paper(pid, max_k=max_k, repair_missing=repair_missing)
+            combos = self.generate_combinations_for_paper(pid, max_k=max_k, repair_missing=repair_missing,
+                                                          persist=False)
             out[pid] = combos or []
+
+        # Single batched write for all papers instead of one query per paper
+        rows = [{"paper_id": pid, "combo": c} for pid, combos in out.items() for c in combos]
+        if rows:
+            self._write_combo_rows(rows)
+            log.info("  > Persisted %d paper-combination links for %d papers.", len(rows), len(out))
         return out
@@ -1,7 +1,12 @@
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.exceptions import OutputParserException
 from pydantic import BaseModel, Field
-from langchain_core.output_parsers import JsonOutputParser
 from typing import List, Dict, Any, Optional
+import asyncio
+from services.llm_utils import structured_model, invoke_with_feedback, ainvoke_with_feedback
+from services.log_utils import get_logger
+
+log = get_logger(__name__)
 
 class Author(BaseModel):
     name: str = Field(description="Nama lengkap penulis.")
@@ -20,13 +25,20 @@ class Paper(BaseModel):
     authors: List[Author] = Field(description="Daftar penulis paper, minimal satu penulis.")
     references: List[Reference] = Field(description="Daftar pustaka atau referensi.")
 
+def _require_dict(raw):
+    if not isinstance(raw, dict):
+        raise OutputParserException(f"Expected a JSON object, got {type(raw).__name__}")
+    return raw
+
 class LLMGraphExtractionService:
     def __init__(self, llm, graph_service):
         self.llm = llm
         self.graph_service = graph_service
         self.prompt = self._create_prompt()
-        self.parser = JsonOutputParser(pydantic_object=Paper)
-        self.chain = self.prompt | self.llm | self.parser
+        # Provider-enforced JSON schema when the model supports it, parser otherwise
+        self.chain = self.prompt | structured_model(self.llm, Paper)
+        # same model returning {raw, parsed, parsing_error}, so feedback retries can echo the raw answer
+        self._model_with_raw = structured_model(self.llm, Paper, include_raw=True)
 
     def _create_prompt(self):
         return ChatPromptTemplate.from_messages([
@@ -48,59 +60,104 @@ class LLMGraphExtractionService:
             ("human", "Ekstrak informasi terstruktur dari teks paper berikut:\n\n```{text}```"),
         ])
 
+    def _normalize_graph_data(self, graph_data: dict) -> dict:
+        # Validate and normalize data
+        if isinstance(graph_data.get('venue'), dict):
+            graph_data['venue'] = graph_data['venue'].get('name', graph_data['venue'].get('title', str(graph_data['venue'])))
+        if not graph_data.get('venue'):
+            graph_data['venue'] = "Unknown Journal or Conference"
+        if not graph_data.get('title'):
+            graph_data['title'] = "Untitled Paper"
+        if not graph_data.get('abstract'):
+            graph_data['abstract'] = "No abstract provided; paper discusses academic research."
+        if not graph_data.get('authors') or not isinstance(graph_data.get('authors'), list):
+            graph_data['authors'] = [{"name": "Unknown Author", "email": None}]
+        else:
+            valid_authors = []
+            for author in graph_data['authors']:
+                if isinstance(author, dict) and 'name' in author:
+                    valid_authors.append({
+                        "name": author.get('name', "Unknown Author"),
+                        "email": author.get('email', None)
+                    })
+                elif isinstance(author, str):
+                    valid_authors.append({"name": author, "email": None})
+            graph_data['authors'] = valid_authors if valid_authors else [{"name": "Unknown Author", "email": None}]
+        if not graph_data.get('references') or not isinstance(graph_data.get('references'), list):
+            graph_data['references'] = []
+        else:
+            valid_references = []
+            for ref in graph_data['references']:
+                if isinstance(ref, dict) and ref.get('title'):
+                    valid_references.append({
+                        "title": ref.get('title', "Unknown Reference"),
+                        "doi": ref.get('doi', None)
+                    })
+                elif isinstance(ref, str):
+                    valid_references.append({"title": ref, "doi": None})
+            graph_data['references'] = valid_references
+        return graph_data
+
+    def _import_graph_data(self, filename: str, graph_data: dict) -> Optional[dict]:
+        # Import paper graph and get UUID
+        paper_id = self.graph_service.import_paper_graph(graph_data, filename)
+        if not paper_id:
+            log.error("  > Failed to import graph for %s", filename)
+            return None
+        return {"paper_id": paper_id, "graph_data": graph_data}
+
     def process_document(self, pdf_path: str, filename: str, full_text: str) -> Optional[dict]:
-        print(f"  > Processing PDF: {filename}")
+        log.info("  > Processing PDF: %s", filename)
         if not full_text or not isinstance(full_text, str) or not full_text.strip():
-            print(f"  > No valid text provided for {filename}")
+            log.warning("  > No valid text provided for %s", filename)
             return None
         
         # Extract structured data
-        print("  > Sending document to LLM for structured graph extraction...")
+        log.info("  > Sending document to LLM for structured graph extraction...")
         try:
-            graph_data = self.chain.invoke({"text": full_text})
-            # Validate and normalize data
-            if isinstance(graph_data.get('venue'), dict):
-                graph_data['venue'] = graph_data['venue'].get('name', graph_data['venue'].get('title', str(graph_data['venue'])))
-            if not graph_data.get('venue'):
-                graph_data['venue'] = "Unknown Journal or Conference"
-            if not graph_data.get('title'):
-                graph_data['title'] = "Untitled Paper"
-            if not graph_data.get('abstract'):
-                graph_data['abstract'] = "No abstract provided; paper discusses academic research."
-            if not graph_data.get('authors') or not isinstance(graph_data.get('authors'), list):
-                graph_data['authors'] = [{"name": "Unknown Author", "email": None}]
-            else:
-                valid_authors = []
-                for author in graph_data['authors']:
-                    if isinstance(author, dict) and 'name' in author:
-                        valid_authors.append({
-                            "name": author.get('name', "Unknown Author"),
-                            "email": author.get('email', None)
-                        })
-                    elif isinstance(author, str):
-                        valid_authors.append({"name": author, "email": None})
-                graph_data['authors'] = valid_authors if valid_authors else [{"name": "Unknown Author", "email": None}]
-            if not graph_data.get('references') or not isinstance(graph_data.get('references'), list):
-                graph_data['references'] = []
-            else:
-                valid_references = []
-                for ref in graph_data['references']:
-                    if isinstance(ref, dict) and ref.get('title'):
-                        valid_references.append({
-                            "title": ref.get('title', "Unknown Reference"),
-                            "doi": ref.get('doi', None)
-                        })
-                    elif isinstance(ref, str):
-                        valid_references.append({"title": ref, "doi": None})
-                graph_data['references'] = valid_references
-            
-            # Import paper graph and get UUID
-            paper_id = self.graph_service.import_paper_graph(graph_data, filename)
-            if not paper_id:
-                print(f"  > Failed to import graph for {filename}")
-                return None
-                
-            return {"paper_id": paper_id, "graph_data": graph_data}
+            raw = invoke_with_feedback(self.prompt, self._model_with_raw, {"text": full_text}, _require_dict)
+            graph_data = self._normalize_graph_data(raw)
+            return self._import_graph_data(filename, graph_data)
         except Exception as e:
-            print(f"  > Failed to process document {filename}: {e}")
-            return None
\ No newline at end of file
+            log.error("  > Failed to process document %s: %s", filename, e)
+            return None
+
+    async def aextract_document(self, filename: str, full_text: str) -> Optional[dict]:
+        """LLM extraction only (no Neo4j writes), safe to run concurrently."""
+        if not full_text or not isinstance(full_text, str) or not full_text.strip():
+            log.warning("  > No valid text provided for %s", filename)
+            return None
+        try:
+            raw = await ainvoke_with_feedback(self.prompt, self._model_with_raw, {"text": full_text}, _require_dict)
+            return self._normalize_graph_data(raw)
+        except Exception as e:
+            log.error("  > Failed to extract document %s: %s", filename, e)
+            return None
+
+    async def aprocess_pdfs(self, pdfs: Dict[str, str], concurrency: int = 8) -> Dict[str, dict]:
+        """Extract all PDFs concurrently, then import them into Neo4j one by one."""
+        sem = asyncio.Semaphore(max(1, concurrency))
+
+        async def _one(fn: str, txt: str):
+            async with sem:
+                return await self.aextract_document(fn, txt)
+
+        files = list(pdfs.items())
+        log.info("  > Sending %d documents to LLM for structured graph extraction...", len(files))
+        extracted = await asyncio.gather(*(_one(fn, txt) for fn, txt in files))
+
+        results = {}
+        for (fn, _), graph_data in zip(files, extracted):
+            if graph_data is None:
+                continue
+            try:
+                res = self._import_graph_data(fn, graph_data)
+            except Exception as e:
+                log.error("  > Failed to process document %s: %s", fn, e)
+                res = None
+            if res:
+                results[fn] = res
+        return results
+
+    def process_pdfs(self, pdfs: Dict[str, str], concurrency: int = 8) -> Dict[str, dict]:
+        return asyncio.run(self.aprocess_pdfs(pdfs, concurrency=concurrency))
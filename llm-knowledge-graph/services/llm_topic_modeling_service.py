@@ -2,31 +2,74 @@ from __future__ import annotations
 from typing import Dict, Any, List, Tuple, Optional
 from pydantic import BaseModel, Field
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.exceptions import OutputParserException
 import re
+from functools import lru_cache
 import json
-
-def _clean_text(s: str) -> str:
-    if not isinstance(s, str):
-        return ""
-    s = re.sub(r"ISSN:?\s*\d{4}-\d{4}", " ", s, flags=re.I)
-    s = re.sub(r"https?://\S+|www\.\S+", " ", s)
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
-
+import os
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from services.text_utils import clean_text as _clean_text
+from services.llm_cache import LLMResponseCache, make_cache_key, llm_model_name
+from services.log_utils import get_logger
+from services.llm_utils import structured_model, invoke_with_feedback, ainvoke_with_feedback
+
+log = get_logger(__name__)
+
+try:
+    from rapidfuzz import fuzz as _fuzz, process as _fuzz_process, utils as _fuzz_utils
+except Exception:
+    _fuzz_process = None
+
+# Local (non-LLM) term mapping thresholds
+LOCAL_FUZZY_CUTOFF = 90       # rapidfuzz token_sort_ratio
+LOCAL_SIM_THRESHOLD = 0.75    # cosine similarity to the nearest CSO topic
+LOCAL_TIE_EPSILON = 0.02      # top-2 closer than this -> let the LLM break the tie
+LOCAL_TIE_CANDIDATES = 5
+
+TOPICS_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "cso_topics_cache.json")
+TOPICS_CACHE_TTL = 24 * 3600
+
+# Bump when a prompt changes so cached responses from the old prompt are not reused
+TM_PROMPT_VERSION = "tm_v1"
+MAP_PROMPT_VERSION = "map_v1"
+
+_PAREN_RE = re.compile(r"\s*\([^)]+\)\s*")
+_WS_RE = re.compile(r"\s+")
+
+@lru_cache(maxsize=100_000)
 def _normalize_label(s: str) -> str:
     if not isinstance(s, str):
         return ""
     s = s.lower().strip()
     s = s.replace("-", " ")
-    s = re.sub(r"\s*\([^)]+\)\s*", " ", s)
-    s = re.sub(r"\s+", " ", s)
+    s = _PAREN_RE.sub(" ", s)
+    s = _WS_RE.sub(" ", s)
     if s.endswith("es") and len(s) > 4:
         s = s[:-2]
     elif s.endswith("s") and not s.endswith("ss") and len(s) > 3:
         s = s[:-1]
     return s
 
+@lru_cache(maxsize=100_000)
+def _normalize_word(w: str) -> str:
+    """Singular form of one lowercased word, used on both sides of the CSO token index."""
+    if len(w) > 4 and w.endswith("ies"):
+        return w[:-3] + "y"
+    if w.endswith(("sses", "xes", "ches", "shes")):
+        return w[:-2]
+    if len(w) > 3 and w.endswith("s") and not w.endswith(("ss", "us", "is")):
+        return w[:-1]
+    return w
+
+def _index_words(s: str) -> List[str]:
+    # not _normalize_label: its plural stripping applies to the whole label, not per word
+    words = {_normalize_word(w) for w in _PAREN_RE.sub(" ", s.lower()).replace("-", " ").split()}
+    return [w for w in words if len(w) > 3]
+
 def _extract_title_and_abstract(full_text: str, filename: str) -> str:
     if not full_text:
         return filename.replace(".pdf", "").replace("_", " ").replace("-", " ").strip()
@@ -96,6 +139,15 @@ class LLMTopicsOutput(BaseModel):
     lsa: LSAResult
     lda: LDAResult
 
+class TermMapping(BaseModel):
+    term: str
+    matched_topic: Optional[str] = Field(default=None, description="Topik CSO terpilih, atau None.")
+    confidence: float = Field(default=0.0, description="Keyakinan 0.0-1.0.")
+    reason: Optional[str] = None
+
+class TermMappingBatch(BaseModel):
+    mappings: List[TermMapping] = Field(description="Satu entri per TERM input.")
+
 class LLMTopicModelingService:
     def __init__(
         self,
@@ -108,6 +160,15 @@ class LLMTopicModelingService:
         top_k_map_each: int = 5,
         use_full_document: bool = True,
         max_context_chars: Optional[int] = None,
+        use_cache: bool = True,
+        map_concurrency: int = 8,
+        doc_concurrency: int = 4,
+        local_matching: bool = True,
+        embed_model: str = "sentence-transformers/all-MiniLM-L6-v2",
+        sim_threshold: float = LOCAL_SIM_THRESHOLD,
+        tie_epsilon: float = LOCAL_TIE_EPSILON,
+        refresh_topics: bool = False,
+        skip_linked_min_topics: Optional[int] = None,
     ):
         self.llm = llm
         self.graph_service = graph_service
@@ -116,9 +177,29 @@ class LLMTopicModelingService:
         self.min_confidence = min_confidence
         self.top_k_map_each = top_k_map_each
         self.MAX_TOPICS_IN_PROMPT = max_topics_in_prompt
-
-        self._cso_topics, self._hier = self._fetch_topics_and_hierarchy()
+        self.cache = LLMResponseCache() if use_cache else None
+        self.map_concurrency = map_concurrency
+        self.doc_concurrency = doc_concurrency
+        # Map terms with rapidfuzz / embedding nearest neighbour; the LLM only breaks near ties
+        self.local_matching = local_matching
+        # Opt-in: papers that already have at least this many HAS_TOPIC links are not re-modelled (None = always model)
+        self.skip_linked_min_topics = skip_linked_min_topics
+        self.embed_model_name = embed_model
+        self.sim_threshold = sim_threshold
+        self.tie_epsilon = tie_epsilon
+        self._embedder = None
+        self._cso_emb = None
+        self._pending_has_topic: List[Dict[str, str]] = []
+
+        self._cso_topics, self._hier = self._load_topics_and_hierarchy(refresh=refresh_topics)
         self._cso_map = {_normalize_label(t): t for t in self._cso_topics}
+        # singular word -> positions in self._cso_topics (words longer than 3 chars), for candidate lookup;
+        # _get_cso_candidates splits terms with the same _index_words, so "databases" finds "database"
+        self._cso_lower = [t.lower() for t in self._cso_topics]
+        self._token_index: Dict[str, List[int]] = {}
+        for pos, t in enumerate(self._cso_topics):
+            for w in _index_words(t):
+                self._token_index.setdefault(w, []).append(pos)
 
         # ---------- letakkan skema JSON sebagai string variabel ----------
         self._schema_tm = (
@@ -170,8 +251,9 @@ class LLMTopicModelingService:
              "Kembalikan JSON PENUH persis sesuai skema di atas."
             )
         ])
-        self.tm_parser = JsonOutputParser(pydantic_object=LLMTopicsOutput)
-        self.tm_chain = self.tm_prompt | self.llm | self.tm_parser
+        # {raw, parsed, parsing_error} for invoke_with_feedback; tm_chain keeps returning the parsed dict
+        self._tm_model = structured_model(self.llm, LLMTopicsOutput, include_raw=True)
+        self.tm_chain = self.tm_prompt | structured_model(self.llm, LLMTopicsOutput)
 
         self.map_prompt = ChatPromptTemplate.from_template(
             "Anda ahli ontologi CS. Pilih topik CSO yang paling sesuai untuk TERM berikut,\n"
@@ -188,10 +270,66 @@ class LLMTopicModelingService:
             "Output JSON (format):\n"
             "{json_map_format}"
         )
+        self._map_chain = self.map_prompt | structured_model(self.llm, TermMapping)
+
+        # All unresolved terms of a document in one call (context sent once)
+        self._json_map_batch_format = (
+            '{\n'
+            '  "mappings": [\n'
+            '    {"term": "<input-term>", "matched_topic": "<topic|None>", "confidence": 0.0-1.0, "reason": "<brief>"}\n'
+            '  ]\n'
+            '}'
+        )
+        self.map_batch_prompt = ChatPromptTemplate.from_template(
+            "Anda ahli ontologi CS. Untuk SETIAP TERM berikut, pilih topik CSO yang paling sesuai\n"
+            "dari daftar kandidat milik term tersebut, dengan mempertimbangkan konteks dokumen.\n\n"
+            "KONTEKS:\n"
+            "{context}\n\n"
+            "TERM DAN KANDIDAT TOPIK CSO (JSON):\n"
+            "{items}\n\n"
+            "ATURAN:\n"
+            "- Pilih hanya dari kandidat milik term itu sendiri.\n"
+            "- Jika ada match langsung (string/istilah standar), pilih itu.\n"
+            "- Jika tidak ada, pilih topik semantik paling dekat yang didukung konteks.\n"
+            "- Isi matched_topic dengan None jika tidak yakin (confidence < {min_conf}).\n"
+            "- Kembalikan tepat satu entri per term, dengan term persis seperti input.\n\n"
+            "Output JSON (format):\n"
+            "{json_map_format}"
+        )
+        self._map_batch_chain = self.map_batch_prompt | structured_model(self.llm, TermMappingBatch)
         
         self.use_full_document = use_full_document
         self.max_context_chars = max_context_chars
 
+    # Shared by every instance in the process; backed by TOPICS_CACHE_PATH across processes
+    _topics_memo: Optional[Tuple[List[str], List[str]]] = None
+
+    def _load_topics_and_hierarchy(self, refresh: bool = False) -> Tuple[List[str], List[str]]:
+        cls = type(self)
+        if not refresh and cls._topics_memo is not None:
+            return cls._topics_memo
+        if not refresh and os.path.exists(TOPICS_CACHE_PATH) \
+                and time.time() - os.path.getmtime(TOPICS_CACHE_PATH) < TOPICS_CACHE_TTL:
+            try:
+                with open(TOPICS_CACHE_PATH, encoding="utf-8") as f:
+                    data = json.load(f)
+                cls._topics_memo = (data["topics"], data["hierarchy"])
+                log.info("  > Loaded %d CSO topics from cache.", len(data['topics']))
+                return cls._topics_memo
+            except Exception as e:
+                log.warning("  > Ignoring unreadable topic cache: %s", e)
+
+        topics, hier = self._fetch_topics_and_hierarchy()
+        if topics:
+            cls._topics_memo = (topics, hier)
+            try:
+                os.makedirs(os.path.dirname(TOPICS_CACHE_PATH), exist_ok=True)
+                with open(TOPICS_CACHE_PATH, "w", encoding="utf-8") as f:
+                    json.dump({"topics": topics, "hierarchy": hier}, f, ensure_ascii=False)
+            except OSError as e:
+                log.warning("  > Warning: could not write topic cache: %s", e)
+        return topics, hier
+
     def _fetch_topics_and_hierarchy(self) -> Tuple[List[str], List[str]]:
         try:
             topic_rows = self.graph_service.graph.query(
@@ -206,7 +344,7 @@ class LLMTopicModelingService:
             hier = [f"{r['sub']} -> {r['sup']}" for r in hier_rows]
             return topics, hier
         except Exception as e:
-            print(f"  > Error fetching CSO topics/hierarchy: {e}")
+            log.error("  > Error fetching CSO topics/hierarchy: %s", e)
             return [], []
 
     def _get_cso_candidates(self, term: str) -> List[str]:
@@ -214,14 +352,20 @@ class LLMTopicModelingService:
         cands = []
         if term_norm in self._cso_map:
             cands.append(self._cso_map[term_norm])
-        # quick substring scan
-        low = term_norm
-        for t in self._cso_topics:
-            tl = t.lower()
-            if low in tl or any(w in tl for w in low.split() if len(w) > 3):
-                cands.append(t)
-            if len(cands) >= self.MAX_TOPICS_IN_PROMPT:
-                break
+        words = _index_words(term)
+        if words:
+            # inverted index lookup, kept in CSO topic order
+            hits = set()
+            for w in words:
+                hits.update(self._token_index.get(w, ()))
+            cands.extend(self._cso_topics[pos] for pos in sorted(hits)[: self.MAX_TOPICS_IN_PROMPT])
+        else:
+            # short terms (e.g. acronyms): substring scan
+            for t, tl in zip(self._cso_topics, self._cso_lower):
+                if term_norm and term_norm in tl:
+                    cands.append(t)
+                if len(cands) >= self.MAX_TOPICS_IN_PROMPT:
+                    break
         seen, out = set(), []
         for x in cands:
             if x not in seen:
@@ -229,19 +373,74 @@ class LLMTopicModelingService:
         return out[: self.MAX_TOPICS_IN_PROMPT]
     
     def _make_context(self, full_text: str, filename: str) -> str:
-        txt = _clean_text(full_text or "")
-        if self.max_context_chars and len(txt) > self.max_context_chars:
-            return txt[: self.max_context_chars]
-        return txt
+        raw = full_text or ""
+        limit = self.max_context_chars
+        if not limit:
+            return _clean_text(raw)
+        # Clean only a prefix of the raw text; grow it if cleaning shrank it below the limit.
+        # The margin keeps a token cut at the window edge out of the returned slice.
+        window = 2 * limit + 64
+        while True:
+            txt = _clean_text(raw[:window])
+            if window >= len(raw) or len(txt) > limit + 64:
+                return txt[:limit]
+            window *= 2
+
+    def _cache_get(self, key: Optional[str], model=None):
+        """Cached value for key (revalidated against model when given); invalid entries are evicted."""
+        if key is None:
+            return None
+        value = self.cache.get(key)
+        if value is None or model is None:
+            return value
+        try:
+            return model.model_validate(value)
+        except Exception:
+            self.cache.delete(key)
+            return None
+
+    def _cache_put(self, key: Optional[str], value) -> None:
+        if key is not None:
+            self.cache.set(key, value)
+
+    def _tm_lookup(self, context: str):
+        if self.cache is None:
+            return None, None
+        key = make_cache_key(llm_model_name(self.llm), TM_PROMPT_VERSION,
+                             self.n_topics, self.n_top_terms_per_doc, context)
+        cached = self._cache_get(key, LLMTopicsOutput)
+        if cached is not None:
+            log.info("  > Using cached topic modeling result.")
+        return key, cached
 
     def _run_lsa_lda_like(self, context: str) -> LLMTopicsOutput:
-        raw = self.tm_chain.invoke({
+        key, cached = self._tm_lookup(context)
+        if cached is not None:
+            return cached
+
+        out = invoke_with_feedback(self.tm_prompt, self._tm_model, self._tm_inputs(context), self._parse_tm_output)
+        self._cache_put(key, out.model_dump())
+        return out
+
+    async def _arun_lsa_lda_like(self, context: str) -> LLMTopicsOutput:
+        key, cached = self._tm_lookup(context)
+        if cached is not None:
+            return cached
+
+        out = await ainvoke_with_feedback(self.tm_prompt, self._tm_model, self._tm_inputs(context),
+                                          self._parse_tm_output)
+        self._cache_put(key, out.model_dump())
+        return out
+
+    def _tm_inputs(self, context: str) -> Dict[str, Any]:
+        return {
             "context": context,
             "k": self.n_topics,
             "n_top": self.n_top_terms_per_doc,
             "schema_tm": self._schema_tm,
-        })
+        }
 
+    def _parse_tm_output(self, raw) -> LLMTopicsOutput:
         try:
             if isinstance(raw, LLMTopicsOutput):
                 return raw
@@ -249,19 +448,17 @@ class LLMTopicModelingService:
                 raw = json.loads(raw)
             if isinstance(raw, dict):
                 return LLMTopicsOutput.model_validate(raw)
-            raise TypeError(f"Unexpected LLM output type: {type(raw)}")
+            raise OutputParserException(f"Unexpected LLM output type: {type(raw)}")
         except Exception as e:
-            print(f"  > Failed to parse LLM output into LLMTopicsOutput: {e}")
-            try:
-                snippet = str(raw)[:500]
-                print(f"  > Raw output snippet: {snippet}")
-            except:
-                pass
+            log.warning("  > Failed to parse LLM output into LLMTopicsOutput: %s", e)
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("  > Raw output snippet: %.500s", raw)
             raise
 
-    def _map_terms(self, filename: str, full_text: str,
-                   lsa_terms: List[Tuple[str, float]],
-                   lda_terms: List[Tuple[str, float]]) -> List[str]:
+    def _prepare_mapping(self, filename: str, full_text: str,
+                         lsa_terms: List[Tuple[str, float]],
+                         lda_terms: List[Tuple[str, float]]):
+        """Exact/local/cached matches without the LLM; returns (context, mapped, pending)."""
         terms = []
         for seq in (lsa_terms[: self.top_k_map_each], lda_terms[: self.top_k_map_each]):
             for t, w in seq:
@@ -274,92 +471,259 @@ class LLMTopicModelingService:
                 seen.add(t); uniq.append((t, w))
 
         context = self._make_context(full_text, filename)
-        mapped = []
+        mapped: List[Optional[str]] = [None] * len(uniq)
+        unresolved = []  # (position, term) without an exact match
+        pending = []  # (position, term, candidates, cache key) still needing the LLM
 
-        for term, weight in uniq:
+        for i, (term, weight) in enumerate(uniq):
             # exact-normalized match
             norm = _normalize_label(term)
             if norm in self._cso_map:
-                mapped.append(self._cso_map[norm])
-                print(f"  Exact match: {term} → {self._cso_map[norm]}")
+                mapped[i] = self._cso_map[norm]
+                log.info("  Exact match: %s → %s", term, self._cso_map[norm])
                 continue
 
+            unresolved.append((i, term))
+
+        if not unresolved:
+            # every term matched exactly: no embedding lookup or LLM prompt needed
+            return context, mapped, pending
+
+        if self.local_matching:
+            llm_queue = self._local_match(unresolved, mapped)
+        else:
             # candidate subset for prompt
-            cands = self._get_cso_candidates(term)
+            llm_queue = [(i, term, self._get_cso_candidates(term)) for i, term in unresolved]
+
+        for i, term, cands in llm_queue:
             if not cands:
                 continue
 
-            # LLM
-            parser = JsonOutputParser(pydantic_object=dict)
-            chain = self.map_prompt | self.llm | parser
-            res = chain.invoke({
-                "term": term,
-                "context": context,
-                "cso_candidates": ", ".join(cands),
-                "min_conf": f"{self.min_confidence:.2f}",
-                "json_map_format": self._json_map_format,
-            })
-
-            mt = (res or {}).get("matched_topic")
-            conf = float((res or {}).get("confidence", 0.0) or 0.0)
-            if mt and mt != "None" and conf >= self.min_confidence:
-                mapped.append(mt)
-                print(f"  Semantic match: {term} → {mt} (conf: {conf:.2f})")
+            key = None
+            if self.cache is not None:
+                key = make_cache_key(llm_model_name(self.llm), MAP_PROMPT_VERSION, term, context,
+                                     sorted(cands), self.min_confidence)
+                res = self._cache_get(key)
+                if isinstance(res, dict):
+                    mapped[i] = self._accept_mapping(term, res, cands)
+                    continue
+            pending.append((i, term, cands, key))
+        return context, mapped, pending
+
+    def _map_term_inputs(self, context: str, pending) -> List[Dict[str, Any]]:
+        return [{
+            "term": term,
+            "context": context,
+            "cso_candidates": ", ".join(cands),
+            "min_conf": f"{self.min_confidence:.2f}",
+            "json_map_format": self._json_map_format,
+        } for _, term, cands, _ in pending]
+
+    def _apply_mappings(self, mapped: List[Optional[str]], pending, results) -> List[str]:
+        """Accept/cache LLM answers aligned with `pending`, then return the unique mapped topics."""
+        for (i, term, cands, key), res in zip(pending, results or []):
+            if isinstance(res, Exception):
+                log.warning("  Mapping failed for %s: %s", term, res)
+                continue
+            if isinstance(res, dict):
+                if not self._off_candidates(res, cands):
+                    self._cache_put(key, res)
+                mapped[i] = self._accept_mapping(term, res, cands)
 
         # unique & return
         out = []
         seen = set()
         for t in mapped:
-            if t not in seen:
+            if t and t not in seen:
                 seen.add(t); out.append(t)
         return out
 
-    def link_has_topic(self, filename: str, topics: List[str]) -> None:
+    def _map_terms(self, filename: str, full_text: str,
+                   lsa_terms: List[Tuple[str, float]],
+                   lda_terms: List[Tuple[str, float]]) -> List[str]:
+        """Sync twin of _amap_terms: invoke / batch only, no event loop around the shared llm client."""
+        context, mapped, pending = self._prepare_mapping(filename, full_text, lsa_terms, lda_terms)
+        results = self._map_batch(context, pending) if pending else None
+        if results is None and pending:
+            # Fallback when the batched call fails: one call per term, run concurrently
+            results = self._map_chain.batch(self._map_term_inputs(context, pending),
+                                            config={"max_concurrency": max(1, self.map_concurrency)},
+                                            return_exceptions=True)
+        return self._apply_mappings(mapped, pending, results)
+
+    async def _amap_terms(self, filename: str, full_text: str,
+                          lsa_terms: List[Tuple[str, float]],
+                          lda_terms: List[Tuple[str, float]]) -> List[str]:
+        context, mapped, pending = self._prepare_mapping(filename, full_text, lsa_terms, lda_terms)
+        results = await self._amap_batch(context, pending) if pending else None
+        if results is None and pending:
+            # Fallback when the batched call fails: one concurrent call per term
+            results = await self._map_chain.abatch(self._map_term_inputs(context, pending),
+                                                   config={"max_concurrency": max(1, self.map_concurrency)},
+                                                   return_exceptions=True)
+        return self._apply_mappings(mapped, pending, results)
+
+    def _ensure_cso_embeddings(self) -> np.ndarray:
+        if self._cso_emb is None:
+            from sentence_transformers import SentenceTransformer
+            self._embedder = SentenceTransformer(self.embed_model_name)
+            log.info("  > Embedding %d CSO topics for local term mapping...", len(self._cso_topics))
+            self._cso_emb = self._embedder.encode(
+                self._cso_topics, batch_size=256, normalize_embeddings=True,
+                convert_to_numpy=True, show_progress_bar=False
+            ).astype(np.float32)
+        return self._cso_emb
+
+    def _local_match(self, unresolved: List[Tuple[int, str]],
+                     mapped: List[Optional[str]]) -> List[Tuple[int, str, List[str]]]:
+        """Fill mapped[i] via fuzzy/embedding lookup; return near-tie terms (with candidates) for the LLM."""
+        rest = []
+        for i, term in unresolved:
+            if _fuzz_process is not None:
+                hit = _fuzz_process.extractOne(term, self._cso_topics, scorer=_fuzz.token_sort_ratio,
+                                               processor=_fuzz_utils.default_process,
+                                               score_cutoff=LOCAL_FUZZY_CUTOFF)
+                if hit:
+                    mapped[i] = hit[0]
+                    log.info("  Fuzzy match: %s → %s (score: %.0f)", term, hit[0], hit[1])
+                    continue
+            rest.append((i, term))
+
+        if not rest or not self._cso_topics:
+            return []
+
+        emb = self._ensure_cso_embeddings()
+        q = self._embedder.encode([t for _, t in rest], normalize_embeddings=True,
+                                  convert_to_numpy=True, show_progress_bar=False).astype(np.float32)
+        sims = q @ emb.T
+        k = min(len(self._cso_topics), LOCAL_TIE_CANDIDATES)
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(sims, top, axis=1), axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+
+        queue = []
+        for row, (i, term) in enumerate(rest):
+            s1 = float(sims[row, top[row, 0]])
+            s2 = float(sims[row, top[row, 1]]) if k > 1 else -1.0
+            if s1 < self.sim_threshold:
+                continue
+            if s1 - s2 < self.tie_epsilon:
+                queue.append((i, term, [self._cso_topics[j] for j in top[row]]))
+                continue
+            mapped[i] = self._cso_topics[top[row, 0]]
+            log.info("  Embedding match: %s → %s (sim: %.2f)", term, mapped[i], s1)
+        return queue
+
+    def _map_batch_inputs(self, context: str, pending) -> Dict[str, str]:
+        items = [{"term": term, "candidates": cands} for _, term, cands, _ in pending]
+        return {
+            "context": context,
+            "items": json.dumps(items, ensure_ascii=False),
+            "min_conf": f"{self.min_confidence:.2f}",
+            "json_map_format": self._json_map_batch_format,
+        }
+
+    @staticmethod
+    def _align_batch(res, pending) -> List[Optional[dict]]:
+        """Batched answers aligned with `pending` (None = term omitted)."""
+        by_term = {}
+        for m in (res or {}).get("mappings") or []:
+            if isinstance(m, dict) and isinstance(m.get("term"), str):
+                by_term.setdefault(m["term"].strip().lower(), m)
+        return [by_term.get(term) for _, term, _, _ in pending]
+
+    def _map_batch(self, context: str, pending) -> Optional[List[Optional[dict]]]:
+        """One LLM call for every pending term; None if the call fails."""
+        try:
+            return self._align_batch(self._map_batch_chain.invoke(self._map_batch_inputs(context, pending)), pending)
+        except Exception as e:
+            log.warning("  Batched mapping failed (%s); falling back to per-term calls.", e)
+            return None
+
+    async def _amap_batch(self, context: str, pending) -> Optional[List[Optional[dict]]]:
+        try:
+            res = await self._map_batch_chain.ainvoke(self._map_batch_inputs(context, pending))
+            return self._align_batch(res, pending)
+        except Exception as e:
+            log.warning("  Batched mapping failed (%s); falling back to per-term calls.", e)
+            return None
+
+    @staticmethod
+    def _candidate_topic(res, cands: List[str]) -> Optional[str]:
+        """The answer's matched_topic as spelled in cands; None if it is not one of this term's candidates."""
+        mt = (res or {}).get("matched_topic")
+        if not isinstance(mt, str):
+            return None
+        mt = mt.strip().lower()
+        return next((c for c in cands if c.lower() == mt), None)
+
+    def _off_candidates(self, res, cands: List[str]) -> bool:
+        """True when the answer names a topic outside cands (cross-assigned in a batch, or invented)."""
+        mt = (res or {}).get("matched_topic")
+        return bool(mt) and mt != "None" and self._candidate_topic(res, cands) is None
+
+    def _accept_mapping(self, term: str, res, cands: List[str]) -> Optional[str]:
+        mt = (res or {}).get("matched_topic")
+        conf = float((res or {}).get("confidence", 0.0) or 0.0)
+        if mt and mt != "None" and conf >= self.min_confidence:
+            topic = self._candidate_topic(res, cands)
+            if topic is None:
+                log.warning("  Rejected mapping %s → %s: not one of its candidates", term, mt)
+                return None
+            log.info("  Semantic match: %s → %s (conf: %.2f)", term, topic, conf)
+            return topic
+        return None
+
+    def link_has_topic(self, filename: str, topics: List[str], defer: bool = False) -> None:
+        """Link now, or queue the rows (defer=True) for a single flush_has_topic() write."""
         if not topics:
             return
+        self._pending_has_topic.extend({"filename": filename, "topic": t} for t in topics)
+        if not defer:
+            self.flush_has_topic()
+
+    def flush_has_topic(self) -> None:
+        rows, self._pending_has_topic = self._pending_has_topic, []
+        if not rows:
+            return
         try:
             self.graph_service.graph.query(
                 """UNWIND $rows AS row
                    MATCH (p:Paper {filename: row.filename})
                    MATCH (t:Topic {label: row.topic})
                    MERGE (p)-[:HAS_TOPIC]->(t)""",
-                {"rows": [{"filename": filename, "topic": t} for t in topics]}
+                {"rows": rows}
             )
-            print(f"  Created {len(topics)} HAS_TOPIC relationships")
+            self.graph_service.bump_topic_link_version()
+            log.info("  Created %d HAS_TOPIC relationships", len(rows))
         except Exception as e:
-            print(f"  Error creating HAS_TOPIC: {e}")
+            log.error("  Error creating HAS_TOPIC: %s", e)
 
-    def process_document(self, filename: str, full_text: str, link_to_graph: bool = True) -> Dict[str, Any]:
-        ctx = self._make_context(full_text, filename)
-
-        print(f"\n=== LLM Topic Modeling (LSA-like & LDA-like) ===")
-        out: LLMTopicsOutput = self._run_lsa_lda_like(ctx)
-
-        print("\n[LSA-like] Top terms:")
+    def _print_tm_output(self, out: LLMTopicsOutput) -> None:
+        log.info("\n=== LLM Topic Modeling (LSA-like & LDA-like) ===")
+        log.info("\n[LSA-like] Top terms:")
         for term, w in out.lsa.doc_terms[: self.n_top_terms_per_doc]:
-            print(f"  - {term}: {w:.4f}")
-        print("\n[LSA-like] Topics:")
+            log.info("  - %s: %.4f", term, w)
+        log.info("\n[LSA-like] Topics:")
         for t in out.lsa.topics:
-            words = ", ".join(t.top_words[:8])
-            print(f"  Topic {t.topic_id}: {words}")
+            log.info("  Topic %s: %s", t.topic_id, ", ".join(t.top_words[:8]))
 
-        print("\n[LDA-like] doc_topic:", [round(x, 4) for x in out.lda.doc_topic])
-        print("\n[LDA-like] Top terms:")
+        log.info("\n[LDA-like] doc_topic: %s", [round(x, 4) for x in out.lda.doc_topic])
+        log.info("\n[LDA-like] Top terms:")
         for term, w in out.lda.doc_terms[: self.n_top_terms_per_doc]:
-            print(f"  - {term}: {w:.4f}")
-        print("\n[LDA-like] Topics:")
+            log.info("  - %s: %.4f", term, w)
+        log.info("\n[LDA-like] Topics:")
         for t in out.lda.topics:
-            words = ", ".join(t.top_words[:8])
-            print(f"  Topic {t.topic_id}: {words}")
+            log.info("  Topic %s: %s", t.topic_id, ", ".join(t.top_words[:8]))
 
-        # mapping to CSO
-        mapped = self._map_terms(filename, full_text, out.lsa.doc_terms, out.lda.doc_terms)
-        print("\n[Mapping] Matched CSO topics:")
+    def _finish_document(self, filename: str, out: LLMTopicsOutput, mapped: List[str],
+                         link_to_graph: bool, defer_link: bool = False) -> Dict[str, Any]:
+        log.info("\n[Mapping] Matched CSO topics:")
         for m in mapped:
-            print(f"  - {m}")
+            log.info("  - %s", m)
 
         if link_to_graph and mapped:
-            self.link_has_topic(filename, mapped)
+            self.link_has_topic(filename, mapped, defer=defer_link)
 
         return {
             "lsa": out.lsa.model_dump(),
@@ -367,9 +731,101 @@ class LLMTopicModelingService:
             "mapped_topics": mapped
         }
 
+    def _existing_topics(self, filenames: List[str]) -> Dict[str, List[str]]:
+        """Linked topic labels per filename, for all filenames in one query."""
+        try:
+            rows = self.graph_service.graph.query(
+                """UNWIND $filenames AS filename
+                   MATCH (p:Paper {filename: filename})-[:HAS_TOPIC]->(t:Topic)
+                   RETURN filename, collect(DISTINCT t.label) AS labels""",
+                {"filenames": filenames}
+            )
+            return {r["filename"]: r["labels"] for r in rows}
+        except Exception as e:
+            log.warning("  > Could not check existing topics for %d file(s): %s", len(filenames), e)
+            return {}
+
+    def _skip_if_linked(self, filename: str, link_to_graph: bool,
+                        existing: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        if not link_to_graph or not self.skip_linked_min_topics:
+            return None
+        if existing is None:
+            existing = self._existing_topics([filename]).get(filename, [])
+        if len(existing) < self.skip_linked_min_topics:
+            return None
+        log.info("  > %s already has %d topics linked; skipping topic modeling.", filename, len(existing))
+        return {"lsa": None, "lda": None, "mapped_topics": existing, "skipped": True}
+
+    def process_document(self, filename: str, full_text: str, link_to_graph: bool = True,
+                         defer_link: bool = False,
+                         existing: Optional[List[str]] = None) -> Dict[str, Any]:
+        skipped = self._skip_if_linked(filename, link_to_graph, existing)
+        if skipped is not None:
+            return skipped
+
+        ctx = self._make_context(full_text, filename)
+        out: LLMTopicsOutput = self._run_lsa_lda_like(ctx)
+        self._print_tm_output(out)
+
+        # mapping to CSO
+        mapped = self._map_terms(filename, full_text, out.lsa.doc_terms, out.lda.doc_terms)
+        return self._finish_document(filename, out, mapped, link_to_graph, defer_link=defer_link)
+
+    async def aprocess_document(self, filename: str, full_text: str, link_to_graph: bool = True,
+                                defer_link: bool = False,
+                                existing: Optional[List[str]] = None) -> Dict[str, Any]:
+        """existing: topics already linked to the paper, when the caller looked them up in bulk."""
+        skipped = self._skip_if_linked(filename, link_to_graph, existing)
+        if skipped is not None:
+            return skipped
+
+        ctx = self._make_context(full_text, filename)
+        out: LLMTopicsOutput = await self._arun_lsa_lda_like(ctx)
+        self._print_tm_output(out)
+
+        mapped = await self._amap_terms(filename, full_text, out.lsa.doc_terms, out.lda.doc_terms)
+        return self._finish_document(filename, out, mapped, link_to_graph, defer_link=defer_link)
+
+    async def aprocess_pdfs(self, pdfs: Dict[str, str], link_to_graph: bool = True) -> Dict[str, Any]:
+        sem = asyncio.Semaphore(max(1, self.doc_concurrency))
+        # one lookup for every file up front, instead of a blocking query per document on the event loop
+        existing = {}
+        if link_to_graph and self.skip_linked_min_topics:
+            existing = self._existing_topics(list(pdfs))
+
+        async def _one(fn: str, txt: str):
+            async with sem:
+                try:
+                    return await self.aprocess_document(fn, txt, link_to_graph=link_to_graph, defer_link=True,
+                                                        existing=existing.get(fn, []))
+                except Exception as e:
+                    log.error("  > Failed to process %s: %s", fn, e)
+                    return None
+
+        files = list(pdfs.items())
+        outputs = await asyncio.gather(*(_one(fn, txt) for fn, txt in files))
+        # one UNWIND for every document's HAS_TOPIC links
+        self.flush_has_topic()
+        return {fn: res for (fn, _), res in zip(files, outputs) if res is not None}
+
     def process_pdfs(self, pdfs: Dict[str, str], link_to_graph: bool = True) -> Dict[str, Any]:
-        results = {}
-        for fn, txt in pdfs.items():
-            res = self.process_document(fn, txt, link_to_graph=link_to_graph)
-            results[fn] = res
-        return results
+        """Sync variant of aprocess_pdfs: documents on a thread pool, no asyncio.run per call, so the
+        long-lived llm client is never reused on a closed event loop. Async callers use aprocess_pdfs."""
+        existing = {}
+        if link_to_graph and self.skip_linked_min_topics:
+            existing = self._existing_topics(list(pdfs))
+
+        def _one(fn: str, txt: str):
+            try:
+                return self.process_document(fn, txt, link_to_graph=link_to_graph, defer_link=True,
+                                             existing=existing.get(fn, []))
+            except Exception as e:
+                log.error("  > Failed to process %s: %s", fn, e)
+                return None
+
+        files = list(pdfs.items())
+        with ThreadPoolExecutor(max_workers=max(1, self.doc_concurrency)) as pool:
+            outputs = list(pool.map(lambda item: _one(*item), files))
+        # one UNWIND for every document's HAS_TOPIC links
+        self.flush_has_topic()
+        return {fn: res for (fn, _), res in zip(files, outputs) if res is not None}
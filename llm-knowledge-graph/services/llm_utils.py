@@ -0,0 +1,157 @@
+from __future__ import annotations
+import json
+import time
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+from pydantic import BaseModel, ValidationError
+from langchain_core.exceptions import OutputParserException
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.outputs import Generation
+from langchain_core.runnables import RunnableLambda
+
+try:
+    import orjson
+except Exception:
+    orjson = None
+
+# Errors that mean "the model answered, but not in the expected shape"; anything else is a bug, not retried
+SCHEMA_ERRORS = (OutputParserException, ValidationError, json.JSONDecodeError)
+FEEDBACK_RETRIES = 2
+FEEDBACK_BACKOFF = 1.0
+
+
+def json_loads(text: str | bytes) -> Any:
+    """orjson.loads when installed (raises a ValueError subclass too), else json.loads."""
+    return orjson.loads(text) if orjson is not None else json.loads(text)
+
+
+def _strip_fence(text: str) -> str:
+    text = text.strip()
+    if text.startswith("```"):
+        text = text[3:]
+        if text[:4].lower() == "json":
+            text = text[4:]
+        if text.rstrip().endswith("```"):
+            text = text.rstrip()[:-3]
+    return text.strip()
+
+
+class FastJsonOutputParser(JsonOutputParser):
+    """JsonOutputParser that tries json_loads on the (fence-stripped) text first; partial/odd output falls back to the stock parser."""
+
+    def parse_result(self, result: List[Generation], *, partial: bool = False) -> Any:
+        if not partial:
+            try:
+                return json_loads(_strip_fence(result[0].text))
+            except ValueError:
+                pass
+        return super().parse_result(result, partial=partial)
+
+
+def _to_dict(value: Any) -> Any:
+    return value.model_dump() if isinstance(value, BaseModel) else value
+
+
+def _to_dict_with_raw(out: Dict[str, Any]) -> Dict[str, Any]:
+    return {**out, "parsed": _to_dict(out.get("parsed"))}
+
+
+def _parse_with_raw(parser, message) -> Dict[str, Any]:
+    try:
+        return {"raw": message, "parsed": parser.invoke(message), "parsing_error": None}
+    except OutputParserException as e:
+        return {"raw": message, "parsed": None, "parsing_error": e}
+
+
+def structured_model(llm, schema: Type[BaseModel], include_raw: bool = False):
+    """llm constrained to `schema` by the provider (dict output); llm | FastJsonOutputParser if unsupported.
+
+    include_raw=True returns {"raw", "parsed", "parsing_error"} like with_structured_output, for feedback retries.
+    """
+    try:
+        try:
+            structured = llm.with_structured_output(schema, method="json_schema", include_raw=include_raw)
+        except (TypeError, ValueError):
+            structured = llm.with_structured_output(schema, include_raw=include_raw)
+        return structured | RunnableLambda(_to_dict_with_raw if include_raw else _to_dict)
+    except Exception:
+        parser = FastJsonOutputParser(pydantic_object=schema)
+        if include_raw:
+            return llm | RunnableLambda(lambda message: _parse_with_raw(parser, message))
+        return llm | parser
+
+
+def structured_chain(prompt, llm, schema: Type[BaseModel]):
+    return prompt | structured_model(llm, schema)
+
+
+def _feedback(error: Exception) -> HumanMessage:
+    return HumanMessage(content=(
+        f"Output Anda sebelumnya tidak valid: {error}\n"
+        "Perbaiki dan kembalikan HANYA JSON yang valid sesuai skema."
+    ))
+
+
+def _echo(raw: Any) -> Optional[AIMessage]:
+    """The model's previous answer as a plain AIMessage (tool-call args as JSON text)."""
+    if raw is None:
+        return None
+    content = getattr(raw, "content", raw)
+    if not content:
+        calls = getattr(raw, "tool_calls", None) or []
+        content = json.dumps(calls[0].get("args", {}), ensure_ascii=False) if calls else ""
+    if not isinstance(content, str):
+        content = str(content)
+    return AIMessage(content=content) if content else None
+
+
+def _unpack(out: Any) -> Tuple[Any, Any, Optional[Exception]]:
+    """(raw, parsed, error) for a model built with include_raw=True; (None, out, None) otherwise."""
+    if isinstance(out, dict) and {"raw", "parsed", "parsing_error"} <= out.keys():
+        error = out["parsing_error"]
+        if error is None and out["parsed"] is None:
+            error = OutputParserException("Model returned no structured output")
+        return out["raw"], out["parsed"], error
+    return None, out, None
+
+
+def _retry_messages(messages: list, raw: Any, error: Exception) -> list:
+    """Previous answer (when known) followed by what was wrong with it."""
+    echo = _echo(raw)
+    return messages + ([echo] if echo is not None else []) + [_feedback(error)]
+
+
+def invoke_with_feedback(prompt, model, inputs: Dict[str, Any], validate: Callable[[Any], Any],
+                         retries: int = FEEDBACK_RETRIES, backoff: float = FEEDBACK_BACKOFF) -> Any:
+    """Run prompt -> model and validate; on a schema error, show the model its answer and what was wrong, then retry."""
+    messages = prompt.format_messages(**inputs)
+    for attempt in range(retries + 1):
+        raw = None
+        try:
+            raw, parsed, error = _unpack(model.invoke(messages))
+            if error is not None:
+                raise error
+            return validate(parsed)
+        except SCHEMA_ERRORS as e:
+            if attempt == retries:
+                raise
+            messages = _retry_messages(messages, raw, e)
+            time.sleep(backoff * (attempt + 1))
+
+
+async def ainvoke_with_feedback(prompt, model, inputs: Dict[str, Any], validate: Callable[[Any], Any],
+                                retries: int = FEEDBACK_RETRIES, backoff: float = FEEDBACK_BACKOFF) -> Any:
+    messages = prompt.format_messages(**inputs)
+    for attempt in range(retries + 1):
+        raw = None
+        try:
+            raw, parsed, error = _unpack(await model.ainvoke(messages))
+            if error is not None:
+                raise error
+            return validate(parsed)
+        except SCHEMA_ERRORS as e:
+            if attempt == retries:
+                raise
+            messages = _retry_messages(messages, raw, e)
+            await asyncio.sleep(backoff * (attempt + 1))
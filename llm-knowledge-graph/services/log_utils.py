@@ -0,0 +1,41 @@
+from __future__ import annotations
+import os
+import sys
+import queue
+import atexit
+import logging
+import logging.handlers
+
+_ROOT = "services"
+# e.g. SERVICES_LOG_LEVEL=DEBUG for per-candidate detail, WARNING for quiet production runs
+LOG_LEVEL_ENV = "SERVICES_LOG_LEVEL"
+_listener: logging.handlers.QueueListener | None = None
+
+
+def _ensure_listener() -> None:
+    """Attach one QueueHandler to the 'services' logger; a background thread writes to stdout."""
+    global _listener
+    if _listener is not None:
+        return
+    q: queue.Queue = queue.Queue(-1)
+    out = logging.StreamHandler(sys.stdout)
+    out.setFormatter(logging.Formatter("%(message)s"))
+    _listener = logging.handlers.QueueListener(q, out, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    root = logging.getLogger(_ROOT)
+    root.addHandler(logging.handlers.QueueHandler(q))
+    try:
+        root.setLevel(os.getenv(LOG_LEVEL_ENV, "INFO").upper())
+    except ValueError:
+        root.setLevel(logging.INFO)
+    root.propagate = False
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under 'services' whose records are emitted off the calling thread (same text as print)."""
+    _ensure_listener()
+    if name != _ROOT and not name.startswith(_ROOT + "."):
+        name = f"{_ROOT}.{name}"
+    return logging.getLogger(name)
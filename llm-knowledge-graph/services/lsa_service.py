@@ -1,19 +1,45 @@
 from __future__ import annotations
 from typing import Dict, Any, List, Tuple
-import re
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer, TfidfTransformer
 from sklearn.decomposition import TruncatedSVD
 from sklearn.preprocessing import normalize
+from services.text_utils import clean_text as _clean_text, hashed_term_matrix, top_k_indices as _top_k_indices
 
+# Documents scored per block so only (block, n_terms) of X_hat is ever materialized
+DOC_BLOCK_SIZE = 256
 
-def _clean_text(text: str) -> str:
-    if not isinstance(text, str):
-        return ""
-    text = re.sub(r"ISSN:?\s*\d{4}-\d{4}", " ", text, flags=re.I)
-    text = re.sub(r"https?://\S+|www\.\S+", " ", text)
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
+
+def _top_k_terms(scores: np.ndarray, terms: np.ndarray, k: int) -> Tuple[List[List[str]], List[List[float]]]:
+    """Row-wise top-k (term, score) lists, gathered with NumPy and converted once via tolist()."""
+    idx = _top_k_indices(scores, k)
+    return terms[idx].tolist(), np.take_along_axis(scores, idx, axis=1).tolist()
+
+
+def _score_docs(filenames: List[str], doc_topic: np.ndarray, topic_term: np.ndarray,
+                terms: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
+    """Top terms per document from |doc_topic @ topic_term| (L2-normalized), one block of docs at a time."""
+    doc_terms = []
+    for start in range(0, len(filenames), DOC_BLOCK_SIZE):
+        block = doc_topic[start:start + DOC_BLOCK_SIZE] @ topic_term  # (block, n_terms)
+        np.abs(block, out=block)
+        normalize(block, norm="l2", axis=1, copy=False)
+        block_terms, block_scores = _top_k_terms(block, terms, top_k)
+        doc_terms.extend(
+            {"filename": fn, "model": "LSA", "terms": list(zip(t, v))}
+            for fn, t, v in zip(filenames[start:start + DOC_BLOCK_SIZE], block_terms, block_scores)
+        )
+    return doc_terms
+
+
+def _topic_words(topic_term: np.ndarray, terms: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
+    """Top words per topic by |loading|, reported with their signed loadings."""
+    topic_idx = _top_k_indices(np.abs(topic_term), top_k)
+    top_words = terms[topic_idx].tolist()
+    weights = np.take_along_axis(topic_term, topic_idx, axis=1).tolist()
+    return [{"topic_id": k, "top_words": top_words[k], "weights": weights[k]}
+            for k in range(topic_term.shape[0])]
 
 
 class LSAService:
@@ -33,6 +59,10 @@ class LSAService:
         ngram_range=(1, 2),
         min_df: int | float = 2,     # remove words that are too rare
         max_df: float = 0.9,         # remove words that are too common
+        backend: str = "sklearn",    # "cuml" = GPU TruncatedSVD (falls back to sklearn without CUDA)
+        use_hashing: bool = False,    # HashingVectorizer + TfidfTransformer (no vocabulary in memory)
+        n_hash_features: int = 1 << 20,
+        vocab_sample_docs: int | None = 200,  # docs used to recover readable term names when hashing
     ):
         self.n_topics = n_topics
         self.n_top_terms_per_doc = n_top_terms_per_doc
@@ -42,6 +72,34 @@ class LSAService:
         self.ngram_range = ngram_range
         self.min_df = min_df
         self.max_df = max_df
+        self.backend = backend
+        self.use_hashing = use_hashing
+        self.n_hash_features = n_hash_features
+        self.vocab_sample_docs = vocab_sample_docs
+        # fitted vectorizer/factors from the last run()/run_streaming(), reused by add_documents()
+        self._fitted: Dict[str, Any] | None = None
+
+    def _svd_cuml(self, X, n_components: int) -> Tuple[np.ndarray, np.ndarray] | None:
+        """TruncatedSVD on the GPU; returns host (doc_topic, topic_term) or None if cuML/CUDA is unavailable."""
+        try:
+            import cupy as cp
+            import cupyx.scipy.sparse as cpsp
+            from cuml.decomposition import TruncatedSVD as CuTruncatedSVD
+        except Exception as e:
+            print(f"  > cuML backend unavailable ({e}); using sklearn.")
+            return None
+        try:
+            X_gpu = cpsp.csr_matrix(X.astype(np.float32))
+            svd = CuTruncatedSVD(n_components=n_components, algorithm="jacobi", random_state=self.random_state)
+            try:
+                doc_topic = svd.fit_transform(X_gpu)
+            except (TypeError, ValueError):
+                doc_topic = svd.fit_transform(X_gpu.toarray())
+            # only the small (n_docs, k) and (k, n_terms) factors come back to the host
+            return cp.asnumpy(cp.asarray(doc_topic)), cp.asnumpy(cp.asarray(svd.components_))
+        except Exception as e:
+            print(f"  > cuML SVD failed ({e}); using sklearn.")
+            return None
 
     def run(self, pdf_texts: Dict[str, str]) -> Dict[str, Any]:
         # 1) Prepare documents
@@ -55,51 +113,58 @@ class LSAService:
             return {"doc_terms": [], "topics": [], "n_docs": 0, "n_topics": 0}
 
         # 2) TF-IDF
-        vec = TfidfVectorizer(
-            stop_words=self.stopwords_lang,
-            max_features=self.max_features,
-            ngram_range=self.ngram_range,
-            min_df=self.min_df,
-            max_df=self.max_df,
-        )
-        X = vec.fit_transform(docs)
-        terms = vec.get_feature_names_out()
+        if self.use_hashing:
+            # constant-memory featurization for large corpora; same idf/l2 weighting as TfidfVectorizer
+            counts, terms = hashed_term_matrix(
+                docs,
+                stop_words=self.stopwords_lang,
+                ngram_range=self.ngram_range,
+                min_df=self.min_df,
+                max_df=self.max_df,
+                max_features=self.max_features,
+                n_features=self.n_hash_features,
+                vocab_sample_docs=self.vocab_sample_docs,
+            )
+            X = TfidfTransformer().fit_transform(counts).astype(np.float32, copy=False)
+        else:
+            vec = TfidfVectorizer(
+                stop_words=self.stopwords_lang,
+                max_features=self.max_features,
+                ngram_range=self.ngram_range,
+                min_df=self.min_df,
+                max_df=self.max_df,
+                dtype=np.float32,  # halves SpMV/GEMM traffic in the SVD; top-k ranking is unaffected
+            )
+            X = vec.fit_transform(docs)
+            terms = vec.get_feature_names_out()
         if X.shape[1] == 0:
             return {"doc_terms": [], "topics": [], "n_docs": len(filenames), "n_topics": 0}
+        # X stays sparse (CSR) through the SVD; the dense X_hat is never built, only per-block slices below
+        X = sp.csr_matrix(X)
 
         # 3) SVD
         # Adjust number of topics if needed
         max_possible_topics = min(self.n_topics, max(1, min(X.shape[0], X.shape[1])))
         n_topics_eff = max(1, max_possible_topics)
-        svd = TruncatedSVD(n_components=n_topics_eff, random_state=self.random_state)
-        doc_topic = svd.fit_transform(X)          # shape: (n_docs, k)
-        topic_term = svd.components_              # shape: (k, n_terms)
-
-        # 4) Compute document-term scores
-        doc_term_scores = doc_topic @ topic_term  # (n_docs, n_terms)
-        doc_term_scores = np.abs(doc_term_scores) # absolute values
-        doc_term_scores = normalize(doc_term_scores, norm="l2", axis=1)
+        factors = self._svd_cuml(X, n_topics_eff) if self.backend == "cuml" else None
+        if factors is not None:
+            doc_topic, topic_term = factors
+        else:
+            svd = TruncatedSVD(n_components=n_topics_eff, random_state=self.random_state,
+                               algorithm="randomized", n_iter=5)
+            doc_topic = svd.fit_transform(X)          # shape: (n_docs, k)
+            topic_term = svd.components_              # shape: (k, n_terms)
 
-        # 5) Get top terms per document
-        doc_terms = []
-        top_k_doc = min(self.n_top_terms_per_doc, len(terms))
-        for i, fn in enumerate(filenames):
-            row = doc_term_scores[i]
-            idx = np.argsort(-row)[:top_k_doc]
-            terms_i = [(terms[j], float(row[j])) for j in idx]
-            doc_terms.append({"filename": fn, "model": "LSA", "terms": terms_i})
+        # 4-5) Document-term scores |X_hat| (L2-normalized per row) and top terms, one block of docs at a time
+        doc_terms = _score_docs(filenames, doc_topic, topic_term, terms, min(self.n_top_terms_per_doc, len(terms)))
 
         # 6) Get top words per topic based on |loading|
-        topics = []
-        top_k_topic = min(self.n_top_terms_per_doc, len(terms))
-        for k in range(n_topics_eff):
-            loadings = topic_term[k]
-            idx = np.argsort(-np.abs(loadings))[:top_k_topic]
-            topics.append({
-                "topic_id": k,
-                "top_words": [terms[j] for j in idx],
-                "weights": [float(loadings[j]) for j in idx],
-            })
+        topics = _topic_words(topic_term, terms, min(self.n_top_terms_per_doc, len(terms)))
+
+        # Hashed features have no transform for unseen documents, so only the vocabulary path is kept
+        self._fitted = None if self.use_hashing else {
+            "kind": "tfidf", "vec": vec, "topic_term": topic_term, "terms": terms,
+        }
 
         print(f"Generated {n_topics_eff} LSA topics from {len(filenames)} documents")
         return {
@@ -108,3 +173,125 @@ class LSAService:
             "n_docs": len(filenames),
             "n_topics": n_topics_eff,
         }
+
+    def run_streaming(self, pdf_texts: Dict[str, str], chunksize: int = 20000) -> Dict[str, Any]:
+        """
+        Same output as run(), but TF-IDF + SVD are built by gensim's LsiModel over streamed chunks
+        (memory ~ chunksize docs). Falls back to run() when gensim is not installed.
+        """
+        try:
+            from gensim.corpora import Dictionary
+            from gensim.models import TfidfModel, LsiModel
+            from gensim.matutils import sparse2full
+        except Exception as e:
+            print(f"  > gensim unavailable ({e}); using in-memory LSA.")
+            return self.run(pdf_texts)
+
+        # Same tokenization (stopwords, n-grams) as the TF-IDF vectorizer in run()
+        analyzer = TfidfVectorizer(stop_words=self.stopwords_lang, ngram_range=self.ngram_range).build_analyzer()
+        filenames = [fn for fn, txt in pdf_texts.items() if _clean_text(txt)]
+        if not filenames:
+            return {"doc_terms": [], "topics": [], "n_docs": 0, "n_topics": 0}
+
+        def _tokens():
+            for fn in filenames:
+                yield analyzer(_clean_text(pdf_texts[fn]))
+
+        n_docs = len(filenames)
+        dictionary = Dictionary(_tokens())
+        no_below = self.min_df if isinstance(self.min_df, int) else int(np.ceil(self.min_df * n_docs))
+        no_above = self.max_df if isinstance(self.max_df, float) else self.max_df / n_docs
+        dictionary.filter_extremes(no_below=max(1, no_below), no_above=no_above, keep_n=self.max_features)
+        if len(dictionary) == 0:
+            return {"doc_terms": [], "topics": [], "n_docs": n_docs, "n_topics": 0}
+
+        def _bow():
+            for toks in _tokens():
+                yield dictionary.doc2bow(toks)
+
+        tfidf = TfidfModel(dictionary=dictionary)
+        n_topics_eff = max(1, min(self.n_topics, n_docs, len(dictionary)))
+        lsi = LsiModel(corpus=(tfidf[b] for b in _bow()), id2word=dictionary, num_topics=n_topics_eff,
+                       chunksize=chunksize, power_iters=2, extra_samples=100)
+        topic_term = lsi.get_topics().astype(np.float32)  # (k, n_terms)
+        n_topics_eff = topic_term.shape[0]
+        terms = np.array([dictionary[j] for j in range(len(dictionary))], dtype=object)
+
+        doc_terms = self._score_streamed(filenames, _bow(), lsi, tfidf, topic_term, terms, sparse2full)
+        topics = _topic_words(topic_term, terms, min(self.n_top_terms_per_doc, len(terms)))
+        self._fitted = {
+            "kind": "gensim", "analyzer": analyzer, "dictionary": dictionary, "tfidf": tfidf,
+            "lsi": lsi, "terms": terms, "chunksize": chunksize,
+        }
+
+        print(f"Generated {n_topics_eff} LSA topics from {n_docs} documents (streaming)")
+        return {
+            "doc_terms": doc_terms,
+            "topics": topics,
+            "n_docs": n_docs,
+            "n_topics": n_topics_eff,
+        }
+
+    def _score_streamed(self, filenames: List[str], bows, lsi, tfidf, topic_term: np.ndarray,
+                        terms: np.ndarray, sparse2full) -> List[Dict[str, Any]]:
+        """Project bag-of-words docs through tfidf + lsi and score them DOC_BLOCK_SIZE docs at a time."""
+        doc_terms = []
+        top_k_doc = min(self.n_top_terms_per_doc, len(terms))
+        n_topics = topic_term.shape[0]
+        fn_iter = iter(filenames)
+        block_fns, block_vecs = [], []
+        for b in bows:
+            block_fns.append(next(fn_iter))
+            block_vecs.append(sparse2full(lsi[tfidf[b]], n_topics))
+            if len(block_fns) >= DOC_BLOCK_SIZE:
+                doc_terms.extend(_score_docs(block_fns, np.asarray(block_vecs, dtype=np.float32),
+                                             topic_term, terms, top_k_doc))
+                block_fns, block_vecs = [], []
+        if block_fns:
+            doc_terms.extend(_score_docs(block_fns, np.asarray(block_vecs, dtype=np.float32),
+                                         topic_term, terms, top_k_doc))
+        return doc_terms
+
+    def add_documents(self, new_pdf_texts: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Score new documents against the model from the last run()/run_streaming() without refitting.
+        - run(): vocabulary frozen, new docs folded in (X_new @ V); topics unchanged.
+        - run_streaming(): gensim LsiModel.add_documents() updates the SVD incrementally, topics are refreshed.
+        doc_terms covers only the new documents. Without a fitted model this is just run(new_pdf_texts).
+        """
+        if self._fitted is None:
+            print("  > No fitted LSA model to extend; fitting on the new documents.")
+            return self.run(new_pdf_texts)
+
+        filenames, docs = [], []
+        for fn, txt in new_pdf_texts.items():
+            c = _clean_text(txt)
+            if c:
+                filenames.append(fn)
+                docs.append(c)
+        state = self._fitted
+        terms = state["terms"]
+        if not docs:
+            return {"doc_terms": [], "topics": [], "n_docs": 0, "n_topics": 0}
+
+        if state["kind"] == "tfidf":
+            topic_term = state["topic_term"]
+            doc_topic = np.asarray(state["vec"].transform(docs) @ topic_term.T, dtype=np.float32)
+            doc_terms = _score_docs(filenames, doc_topic, topic_term, terms,
+                                    min(self.n_top_terms_per_doc, len(terms)))
+        else:
+            from gensim.matutils import sparse2full
+            dictionary, tfidf, lsi = state["dictionary"], state["tfidf"], state["lsi"]
+            bows = [dictionary.doc2bow(state["analyzer"](d)) for d in docs]
+            lsi.add_documents([tfidf[b] for b in bows], chunksize=state["chunksize"])
+            topic_term = lsi.get_topics().astype(np.float32)
+            doc_terms = self._score_streamed(filenames, bows, lsi, tfidf, topic_term, terms, sparse2full)
+        topics = _topic_words(topic_term, terms, min(self.n_top_terms_per_doc, len(terms)))
+
+        print(f"Folded {len(filenames)} new documents into {topic_term.shape[0]} LSA topics")
+        return {
+            "doc_terms": doc_terms,
+            "topics": topics,
+            "n_docs": len(filenames),
+            "n_topics": topic_term.shape[0],
+        }
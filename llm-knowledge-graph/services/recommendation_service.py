@@ -1,20 +1,28 @@
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
-from langchain_core.output_parsers import JsonOutputParser
+from services.llm_utils import FastJsonOutputParser
 from typing import List, Dict, Any
-import json
 
 class RecommendationResult(BaseModel):
     filename: str = Field(description="Nama file PDF dari paper yang direkomendasikan.")
     title: str = Field(description="Judul paper yang direkomendasikan.")
     topics: List[str] = Field(description="Daftar topik yang relevan dengan paper.")
 
+def _papers_tsv(papers: List[Dict[str, Any]]) -> str:
+    """One paper per line: id<TAB>filename<TAB>title<TAB>topics joined by ';' (far fewer tokens than JSON)."""
+    def _cell(value) -> str:
+        return str(value or "").replace("\t", " ").replace("\n", " ")
+    return "\n".join(
+        "\t".join((_cell(p["id"]), _cell(p["filename"]), _cell(p["title"]), ";".join(map(_cell, p["topics"]))))
+        for p in papers
+    )
+
 class RecommendationService:
     def __init__(self, llm, graph_service):
         self.llm = llm
         self.graph_service = graph_service
         self.prompt = self._create_prompt()
-        self.parser = JsonOutputParser(pydantic_object=List[RecommendationResult])
+        self.parser = FastJsonOutputParser(pydantic_object=List[RecommendationResult])
         self.chain = self.prompt | self.llm | self.parser
 
     def _create_prompt(self):
@@ -22,8 +30,8 @@ class RecommendationService:
             (
                 "system",
                 """Anda adalah asisten riset yang merekomendasikan paper akademik menggunakan logika Apriori.
-                - Input: topik dari paper user (`user_topics`) dan semua paper di database (`all_papers`, 
-                  berisi id, filename, title, topics).
+                - Input: topik dari paper user (`user_topics`) dan paper kandidat di database (`all_papers`, 
+                  satu paper per baris dengan format TSV: id<TAB>filename<TAB>title<TAB>topik1;topik2;...).
                 - Tugas: Rekomendasikan paper berdasarkan pola co-occurrence topik (seperti Apriori), prioritaskan 
                   paper dengan topik yang sering muncul bersama `user_topics`.
                 - Cara memilih:
@@ -37,11 +45,8 @@ class RecommendationService:
                 Contoh:
                   - Input: 
                     user_topics=["machine learning", "decision support systems"], 
-                    all_papers=[{{
-                      "id": "1", "filename": "paper1.pdf", 
-                      "title": "ML Study", 
-                      "topics": ["machine learning", "neural networks"]
-                    }}]
+                    all_papers=
+                    1\tpaper1.pdf\tML Study\tmachine learning;neural networks
                   - Output:[{{
                       "filename": "paper1.pdf", 
                       "title": "ML Study", 
@@ -73,18 +78,22 @@ class RecommendationService:
                 print("  > No topics found for the given paper IDs. Returning empty recommendations.")
                 return []
 
-            # Ambil semua paper dan topiknya (kecuali paper yang dibaca user)
+            # Ambil paper lain yang berbagi minimal satu topik dengan user (kecuali paper yang dibaca user)
             all_papers_query = """
             MATCH (p:Paper)-[:HAS_TOPIC]->(t:Topic)
             WHERE NOT elementId(p) IN $paper_ids
-            RETURN elementId(p) AS id, p.filename AS filename, p.title AS title, collect(t.label) AS topics
+            WITH p, collect(t.label) AS topics
+            WHERE any(label IN topics WHERE label IN $user_topics)
+            RETURN elementId(p) AS id, p.filename AS filename, p.title AS title, topics
             """
-            all_papers_result = self.graph_service.graph.query(all_papers_query, {"paper_ids": user_paper_ids})
+            all_papers_result = self.graph_service.graph.query(
+                all_papers_query, {"paper_ids": user_paper_ids, "user_topics": user_topics}
+            )
             all_papers = [
                 {"id": record["id"], "filename": record["filename"], "title": record["title"], "topics": record["topics"]}
                 for record in all_papers_result
             ]
-            print(f"  > All papers: {len(all_papers)} papers retrieved")
+            print(f"  > Candidate papers: {len(all_papers)} papers share a topic with the user")
 
             if not all_papers:
                 print("  > No other papers found in the database. Returning empty recommendations.")
@@ -93,7 +102,7 @@ class RecommendationService:
             # Log input ke LLM
             input_data = {
                 "user_topics": user_topics,
-                "all_papers": json.dumps(all_papers, ensure_ascii=False),
+                "all_papers": _papers_tsv(all_papers),
                 "user_paper_ids": user_paper_ids
             }
             print(f"  > Input to LLM: {input_data}")
@@ -101,10 +110,13 @@ class RecommendationService:
             # Dapatkan rekomendasi dari LLM
             recommendations = self.chain.invoke(input_data)
 
-            # Filter untuk memastikan ID paper tidak termasuk dalam rekomendasi
+            # Hanya paper kandidat (query sudah mengecualikan paper user); lookup O(1) per rekomendasi
+            candidate_ids = {paper["filename"]: paper["id"] for paper in all_papers}
+            excluded = set(user_paper_ids)
             recommendations = [
                 rec for rec in recommendations
-                if not any(paper["id"] in user_paper_ids for paper in all_papers if paper["filename"] == rec["filename"])
+                if isinstance(rec, dict) and rec.get("filename") in candidate_ids
+                and candidate_ids[rec["filename"]] not in excluded
             ]
 
             print(f"  > LLM recommendations: {recommendations}")
@@ -0,0 +1,80 @@
+from __future__ import annotations
+import re
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+# ISSN numbers and URLs removed in one pass
+_URL_ISSN_RE = re.compile(r"ISSN:?\s*\d{4}-\d{4}|https?://\S+|www\.\S+", re.I)
+
+
+def clean_text(text: str) -> str:
+    """Remove ISSN numbers and URLs and collapse whitespace (shared by LDA/LSA/LLM topic modeling)."""
+    if not isinstance(text, str):
+        return ""
+    text = _URL_ISSN_RE.sub(" ", text)
+    return " ".join(text.split())
+
+
+def hashed_term_matrix(
+    docs: List[str],
+    stop_words,
+    ngram_range,
+    min_df: int | float,
+    max_df: int | float,
+    max_features: Optional[int],
+    n_features: int = 1 << 20,
+    vocab_sample_docs: Optional[int] = 200,
+) -> Tuple[Any, np.ndarray]:
+    """
+    Bag-of-words counts via HashingVectorizer (no fitted vocabulary held in memory).
+    Column names are recovered only for features seen in the first `vocab_sample_docs`
+    documents (None = all); min_df/max_df/max_features are applied like CountVectorizer.
+    Returns (float32 CSR matrix restricted to named columns, term names sorted alphabetically).
+    """
+    from sklearn.feature_extraction.text import HashingVectorizer
+    from sklearn.utils import murmurhash3_32
+
+    vec = HashingVectorizer(
+        stop_words=stop_words,
+        ngram_range=ngram_range,
+        n_features=n_features,
+        alternate_sign=False,
+        norm=None,
+        dtype=np.float32,
+    )
+    X = vec.transform(docs).tocsr()
+
+    # Reverse map column -> readable term from a sample of documents
+    analyzer = vec.build_analyzer()
+    names: Dict[int, str] = {}
+    sample = docs if vocab_sample_docs is None else docs[:vocab_sample_docs]
+    for doc in sample:
+        for feat in set(analyzer(doc)):
+            names.setdefault(abs(murmurhash3_32(feat, seed=0)) % n_features, feat)
+
+    n_docs = X.shape[0]
+    df = np.bincount(X.indices, minlength=n_features)
+    min_count = min_df if isinstance(min_df, int) else min_df * n_docs
+    max_count = max_df if isinstance(max_df, int) else max_df * n_docs
+    cols = np.fromiter(names.keys(), dtype=np.intp, count=len(names))
+    cols = cols[(df[cols] >= min_count) & (df[cols] <= max_count)]
+    if max_features is not None and len(cols) > max_features:
+        tf = np.asarray(X[:, cols].sum(axis=0)).ravel()
+        cols = cols[np.argsort(-tf, kind="stable")[:max_features]]
+
+    terms = np.array([names[c] for c in cols], dtype=object)
+    order = np.argsort(terms)
+    cols, terms = cols[order], terms[order]
+    return X[:, cols], terms
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Row-wise indices of the k largest values, sorted descending (argpartition + small argsort)."""
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.intp)
+    if k < scores.shape[1]:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        part = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+    order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1)
+    return np.take_along_axis(part, order, axis=1)
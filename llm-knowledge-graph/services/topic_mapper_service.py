@@ -1,18 +1,72 @@
 from __future__ import annotations
-from typing import Dict, List, Tuple, Set
+from typing import Dict, List, Tuple, Set, Optional
+from collections import defaultdict
+import numpy as np
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
+from services.llm_utils import FastJsonOutputParser
 import re
+from functools import lru_cache
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
+from services.text_utils import top_k_indices
+from services.log_utils import get_logger
 
+log = get_logger(__name__)
+
+_PAREN_RE = re.compile(r"\s*\([^)]+\)\s*")
+_WORD4_RE = re.compile(r"\b[a-zA-Z]{4,}\b")
+# Title: first line (of the first 10) longer than 20 chars that is not a section heading
+_TITLE_RE = re.compile(r"^[ \t]*(?!abstract|introduction|keywords)(\S[^\n]{19,}?\S)[ \t\r]*$", re.I | re.M)
+# Abstract: short line mentioning "abstract", up to the keywords / introduction / DOI line
+_ABSTRACT_HEAD_RE = re.compile(r"^[ \t]*(\S[^\n]{0,48}?abstract[^\n]*?|abstract[^\n]*?)[ \t\r]*$", re.I | re.M)
+_ABSTRACT_END_RE = re.compile(r"\n[ \t]*(?:keywords|key words|1\.|1 |introduction|© |doi:|index terms)", re.I)
+_ABSTRACT_MAX_LINES = 21
+
+# Terms never worth matching against CSO
+_STOPWORDS = frozenset({
+    'the', 'and', 'for', 'with', 'are', 'this', 'that', 'from',
+    'been', 'have', 'will', 'can', 'may', 'use', 'used', 'using'
+})
+
+# HAS_TOPIC rows per UNWIND statement when linking many documents at once
+HAS_TOPIC_WRITE_BATCH = 5000
+
+# Embedding pre-match: cosine >= AUTO_ACCEPT is taken directly, below MIN is dropped,
+# only the band in between goes to the LLM with the top EMBED_CANDIDATES topics
+EMBED_AUTO_ACCEPT_SIM = 0.95
+EMBED_MIN_SIM = 0.7
+EMBED_CANDIDATES = 5
+
+# Minimum spacing between match_chain calls across all document workers (the old per-term sleep)
+LLM_MIN_INTERVAL = 1.2
+
+
+class _RateLimiter:
+    """Thread-safe: wait() returns at most once per min_interval seconds across all callers."""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+@lru_cache(maxsize=100_000)
 def _normalize_label(s: str) -> str:
     if not isinstance(s, str):
         return ""
     s = s.lower().strip()
-    s = re.sub(r"\s*\([^)]+\)\s*", " ", s)
-    s = s.replace("-", " ")
-    s = re.sub(r"\s+", " ", s)
+    if "(" in s:
+        s = _PAREN_RE.sub(" ", s)
+    s = " ".join(s.replace("-", " ").split())
     if s.endswith("es") and len(s) > 4:
         s = s[:-2]
     elif s.endswith("s") and not s.endswith("ss") and len(s) > 3:
@@ -25,42 +79,25 @@ def _extract_title_and_abstract(full_text: str, filename: str) -> str:
         return filename.replace('.pdf', '').replace('_', ' ').replace('-', ' ')
     
     text = full_text.strip()
-    lines = text.split('\n')
     
-    title = ""
-    for line in lines[:10]:
-        line = line.strip()
-        if len(line) > 20 and not line.lower().startswith(('abstract', 'introduction', 'keywords')):
-            title = line
-            break
+    head = "\n".join(text.split('\n', 10)[:10])
+    m = _TITLE_RE.search(head)
+    title = m.group(1) if m else filename.replace('.pdf', '').replace('_', ' ').replace('-', ' ')
     
-    if not title:
-        title = filename.replace('.pdf', '').replace('_', ' ').replace('-', ' ')
-    
-    abstract = ""
-    abstract_found = False
     abstract_lines = []
-    
-    for i, line in enumerate(lines):
-        line_lower = line.strip().lower()
-        
-        if 'abstract' in line_lower and len(line_lower) < 50:
-            abstract_found = True
-            if len(line.strip()) > len('abstract') + 5:
-                abstract_lines.append(line.strip())
-            continue
-        
-        if abstract_found:
+    m = next((h for h in _ABSTRACT_HEAD_RE.finditer(text) if len(h.group(1)) < 50), None)
+    if m:
+        header = m.group(1)
+        if len(header) > len('abstract') + 5:
+            abstract_lines.append(header)
+        end = _ABSTRACT_END_RE.search(text, m.end())
+        body = text[m.end():end.start() if end else len(text)]
+        for line in body.split('\n'):
             line = line.strip()
-            if not line:
-                continue
-                
-            if (line_lower.startswith(('keywords', 'key words', '1.', '1 ', 'introduction', 
-                                     '© ', 'doi:', 'index terms')) or
-                len(abstract_lines) > 20):  # Limit abstract length
-                break
-                
-            abstract_lines.append(line)
+            if line:
+                abstract_lines.append(line)
+                if len(abstract_lines) >= _ABSTRACT_MAX_LINES:  # Limit abstract length
+                    break
     
     abstract = ' '.join(abstract_lines)
     
@@ -84,10 +121,21 @@ def _extract_title_and_abstract(full_text: str, filename: str) -> str:
     return context.strip()
 
 class TopicMapperService:
-    def __init__(self, graph_service, llm, min_hits_per_term: int = 1):
+    def __init__(self, graph_service, llm, min_hits_per_term: int = 1,
+                 embed_model: Optional[str] = "sentence-transformers/all-MiniLM-L6-v2",
+                 max_workers: int = 8, max_concurrent_llm: int = 4,
+                 llm_min_interval: float = LLM_MIN_INTERVAL):
         self.graph_service = graph_service
         self.llm = llm
         self.min_hits_per_term = min_hits_per_term
+        self.max_workers = max(1, max_workers)
+        # Shared across document workers: the semaphore bounds calls in flight,
+        # the rate limiter bounds calls per second (same pace as the old sequential loop)
+        self._llm_slots = threading.Semaphore(max(1, max_concurrent_llm))
+        self._llm_rate = _RateLimiter(llm_min_interval)
+        self.embed_model_name = embed_model  # None = LLM + fulltext matching only
+        self._embedder = None
+        self._topic_emb: Optional[np.ndarray] = None
         
         # Token management
         self.TOKENS_PER_MINUTE_LIMIT = 1_000_000
@@ -98,11 +146,19 @@ class TopicMapperService:
         print("Fetching topics from Neo4j...")
         self._cso_topics = self._fetch_topics()
         self._cso_map = {_normalize_label(topic): topic for topic in self._cso_topics}
+        self._cso_topics_lower = [t.lower() for t in self._cso_topics]
+        # word -> topics containing it, replaces the per-term scan over all topics
+        self._word_to_topics: Dict[str, Set[str]] = defaultdict(set)
+        for topic, topic_lower in zip(self._cso_topics, self._cso_topics_lower):
+            for word in topic_lower.split():
+                if len(word) > 2:
+                    self._word_to_topics[word].add(topic)
         
         print(f"Loaded {len(self._cso_topics)} topics")
         self.document_texts = {}
+        self._doc_ctx_cache: Dict[str, str] = {}
         self._setup_search_index()
-        self.match_parser = JsonOutputParser(pydantic_object=dict)
+        self.match_parser = FastJsonOutputParser(pydantic_object=dict)
         self.match_prompt = ChatPromptTemplate.from_template(
             """Anda adalah ahli ontologi ilmu komputer. Cocokkan term berikut dengan topik CSO yang paling sesuai.
             TERM: "{term}"
@@ -141,15 +197,19 @@ class TopicMapperService:
     def set_document_texts(self, pdfs_dict: Dict[str, str]):
         """Store full document texts for context extraction"""
         self.document_texts = pdfs_dict
+        self._doc_ctx_cache.clear()
         print(f"Stored {len(pdfs_dict)} document texts for full context processing")
         
     def _get_document_context(self, filename: str) -> str:
-        """Get title + abstract context from full document text"""
-        if filename in self.document_texts:
-            full_text = self.document_texts[filename]
-            return _extract_title_and_abstract(full_text, filename)
-        
-        return filename.replace('.pdf', '').replace('_', ' ').replace('-', ' ').strip()
+        """Get title + abstract context from full document text (extracted once per filename)"""
+        ctx = self._doc_ctx_cache.get(filename)
+        if ctx is None:
+            if filename in self.document_texts:
+                ctx = _extract_title_and_abstract(self.document_texts[filename], filename)
+            else:
+                ctx = filename.replace('.pdf', '').replace('_', ' ').replace('-', ' ').strip()
+            self._doc_ctx_cache[filename] = ctx
+        return ctx
 
     def _fetch_topics(self) -> List[str]:
         try:
@@ -179,53 +239,92 @@ class TopicMapperService:
         except Exception as e:
             print(f"Warning: Could not create search index: {e}")
 
-    def _get_candidate_topics(self, term: str, document_context: str) -> List[str]:
-        """Get candidate topics using multiple strategies"""
-        candidates = set()
-
-        norm_term = _normalize_label(term)
-        if norm_term in self._cso_map:
-            candidates.add(self._cso_map[norm_term])
-
+    def _fulltext_candidates(self, terms: List[str], document_context: str) -> Dict[str, List[str]]:
+        """Fulltext-index hits (top 15, score > 0.2) for all terms of one document in a single query."""
+        if not terms:
+            return {}
+        context_words = _WORD4_RE.findall(document_context.lower())[:5]  # Limit context words
+        rows = [{"term": term, "q": " ".join([term] + context_words)} for term in terms]
         try:
-            context_words = re.findall(r'\b[a-zA-Z]{4,}\b', document_context.lower())
-            search_terms = [term] + context_words[:5]  # Limit context words
-            search_query = " ".join(search_terms)
-            
             results = self.graph_service.graph.query("""
-                CALL db.index.fulltext.queryNodes("topic_fulltext_index", $query)
+                UNWIND $rows AS r
+                CALL db.index.fulltext.queryNodes("topic_fulltext_index", r.q)
                 YIELD node, score
                 WHERE score > 0.2
-                RETURN node.label AS label, score
+                WITH r, node, score
                 ORDER BY score DESC
-                LIMIT 15
-            """, {"query": search_query})
-            
-            for r in results:
-                candidates.add(r["label"])
-                
+                RETURN r.term AS term, collect(node.label)[..15] AS labels
+            """, {"rows": rows})
         except Exception as e:
-            print(f"Warning: Full-text search failed: {e}")
+            log.warning("Warning: Full-text search failed: %s", e)
+            return {}
+        return {r["term"]: r["labels"] for r in results}
+
+    def _get_candidate_topics(self, term: str, document_context: str,
+                              exact_checked: bool = False,
+                              fulltext: Optional[List[str]] = None) -> List[str]:
+        """Get candidate topics using multiple strategies (`fulltext` = hits prefetched by _fulltext_candidates)"""
+        candidates = set()
+
+        if not exact_checked:
+            norm_term = _normalize_label(term)
+            if norm_term in self._cso_map:
+                candidates.add(self._cso_map[norm_term])
+
+        if fulltext is None:
+            fulltext = self._fulltext_candidates([term], document_context).get(term, [])
+        candidates.update(fulltext)
 
         term_lower = term.lower()
-        for topic in self._cso_topics:
-            topic_lower = topic.lower()
-            if (term_lower in topic_lower or 
-                any(word in topic_lower for word in term_lower.split() if len(word) > 2)):
-                candidates.add(topic)
-                if len(candidates) >= self.MAX_TOPICS_IN_PROMPT:
-                    break
+        word_hits: Set[str] = set()
+        for word in term_lower.split():
+            if len(word) > 2:
+                word_hits.update(self._word_to_topics.get(word, ()))
+        for topic in sorted(word_hits):
+            if len(candidates) >= self.MAX_TOPICS_IN_PROMPT:
+                break
+            candidates.add(topic)
         
         return list(candidates)[:self.MAX_TOPICS_IN_PROMPT]
 
+    def _ensure_topic_embeddings(self) -> Optional[np.ndarray]:
+        """L2-normalized float32 embeddings of all CSO topics, computed once; None if unavailable."""
+        if self._topic_emb is None and self.embed_model_name and self._cso_topics:
+            try:
+                from sentence_transformers import SentenceTransformer
+                self._embedder = SentenceTransformer(self.embed_model_name)
+                print(f"Embedding {len(self._cso_topics)} CSO topics for candidate search...")
+                self._topic_emb = self._embedder.encode(
+                    self._cso_topics, batch_size=256, normalize_embeddings=True,
+                    convert_to_numpy=True, show_progress_bar=False
+                ).astype(np.float32)
+            except Exception as e:
+                print(f"Warning: embedding search unavailable ({e}); using LLM matching only")
+                self.embed_model_name = None
+        return self._topic_emb
+
+    def _embedding_candidates(self, terms: List[str]) -> List[List[Tuple[str, float]]]:
+        """Top EMBED_CANDIDATES (topic, cosine) per term from one batched encode + matrix product."""
+        emb = self._ensure_topic_embeddings()
+        if emb is None or not terms:
+            return []
+        q = self._embedder.encode(terms, normalize_embeddings=True, convert_to_numpy=True,
+                                  show_progress_bar=False).astype(np.float32)
+        sims = q @ emb.T
+        top = top_k_indices(sims, min(EMBED_CANDIDATES, len(self._cso_topics)))
+        return [[(self._cso_topics[j], float(sims[r, j])) for j in top[r]] for r in range(len(terms))]
+
     def _estimate_tokens(self, text: str) -> int:
         return int(len(text) * self.ESTIMATED_TOKENS_PER_CHAR)
 
-    def _semantic_match(self, term: str, weight: float, filename: str) -> Tuple[str, float]:
+    def _semantic_match(self, term: str, weight: float, filename: str,
+                        candidates: Optional[List[str]] = None) -> Tuple[str, float]:
         """Perform semantic matching with full document context"""
         try:
             document_context = self._get_document_context(filename)
-            candidates = self._get_candidate_topics(term, document_context)
+            if candidates is None:
+                # callers reach here only after the exact-label lookup missed
+                candidates = self._get_candidate_topics(term, document_context, exact_checked=True)
             
             if not candidates:
                 return None, 0.0
@@ -247,61 +346,89 @@ class TopicMapperService:
                     document_context = title_line[:300] + "..."
             
             # Perform matching with full context
-            result = self.match_chain.invoke({
-                "term": term,
-                "document_context": document_context,
-                "cso_topics": candidate_text
-            })
+            with self._llm_slots:
+                self._llm_rate.wait()
+                result = self.match_chain.invoke({
+                    "term": term,
+                    "document_context": document_context,
+                    "cso_topics": candidate_text
+                })
             
             if (result.get("matched_topic") and 
                 result["matched_topic"] != "None" and 
                 result.get("confidence", 0) >= 0.9):
                 
-                print(f"  * Semantic match: {term} → {result['matched_topic']}"
-                      f" (conf: {result['confidence']:.2f})")
-                print(f"    Reason: {result.get('reason', 'No reason provided')}")
+                log.debug("  * Semantic match: %s → %s (conf: %.2f) - %s", term, result["matched_topic"],
+                          result["confidence"], result.get("reason", "No reason provided"))
                 
                 return result["matched_topic"], weight * result["confidence"]
             
             return None, 0.0
             
         except Exception as e:
-            print(f"  * Error matching '{term}': {e}")
+            log.warning("  * Error matching '%s': %s", term, e)
             time.sleep(2)
             return None, 0.0
 
-    def _select_candidates(self, terms_with_scores: List[Tuple[str, float]], 
-                         filename: str, top_k: int) -> List[str]:
-        """Select best matching topics with full document context"""
-        matched_topics = {}
+    def _match_terms(self, terms_with_scores: List[Tuple[str, float]],
+                     filename: str) -> Dict[str, Tuple[str, float]]:
+        """Match each unique term (lowercased) once -> (topic, factor); a term's score is its weight * factor"""
+        matches: Dict[str, Tuple[str, float]] = {}
         
-        print(f"  Processing {len(terms_with_scores)} terms with full document context...")
+        log.debug("  Processing %d terms with full document context...", len(terms_with_scores))
         
+        unmatched: List[Tuple[str, float]] = []
         for term, weight in terms_with_scores:
             # Skip very short terms or common words
-            if len(term) < 3 or term.lower() in {
-                'the', 'and', 'for', 'with', 'are', 'this', 'that', 'from', 
-                'been', 'have', 'will', 'can', 'may', 'use', 'used', 'using'
-            }:
+            if len(term) < 3 or term.lower() in _STOPWORDS:
                 continue
             
             # Try exact match first
             norm_term = _normalize_label(term)
-            if norm_term in self._cso_map:
-                topic = self._cso_map[norm_term]
-                matched_topics[topic] = max(matched_topics.get(topic, 0.0), weight)
-                print(f"  ✓ Exact match: {term} → {topic}")
+            topic = self._cso_map.get(norm_term)
+            if topic is not None:
+                matches[term.lower()] = (topic, 1.0)
+                log.debug("  ✓ Exact match: %s → %s", term, topic)
                 continue
-            
-            # Try semantic matching with full document context
-            matched_topic, confidence = self._semantic_match(term, weight, filename)
+            unmatched.append((term, weight))
+
+        # Embedding search for all remaining terms at once; the LLM only sees the uncertain band
+        hits = self._embedding_candidates([term for term, _ in unmatched])
+        fulltext: Dict[str, List[str]] = {}
+        if not hits and unmatched:
+            document_context = self._get_document_context(filename)
+            fulltext = self._fulltext_candidates([term for term, _ in unmatched], document_context)
+        for n, (term, weight) in enumerate(unmatched):
+            if hits:
+                best_topic, best_sim = hits[n][0]
+                if best_sim >= EMBED_AUTO_ACCEPT_SIM:
+                    matches[term.lower()] = (best_topic, best_sim)
+                    log.debug("  ✓ Embedding match: %s → %s (sim: %.2f)", term, best_topic, best_sim)
+                    continue
+                if best_sim < EMBED_MIN_SIM:
+                    continue
+                candidates = [topic for topic, _ in hits[n]]
+            else:
+                candidates = self._get_candidate_topics(term, document_context, exact_checked=True,
+                                                        fulltext=fulltext.get(term, []))
+
+            # Try semantic matching with full document context (weight 1.0 -> confidence)
+            matched_topic, confidence = self._semantic_match(term, 1.0, filename, candidates)
             if matched_topic:
-                matched_topics[matched_topic] = max(
-                    matched_topics.get(matched_topic, 0.0), 
-                    confidence
-                )
-            
-            time.sleep(1.2)
+                matches[term.lower()] = (matched_topic, confidence)
+        return matches
+
+    @staticmethod
+    def _rank_matches(terms_with_scores: List[Tuple[str, float]],
+                      matches: Dict[str, Tuple[str, float]], top_k: int) -> List[str]:
+        """Top-k topics for one model's terms, scored with that model's own weights"""
+        matched_topics: Dict[str, float] = {}
+        for term, weight in terms_with_scores:
+            match = matches.get(term.lower())
+            if match is None:
+                continue
+            topic, factor = match
+            matched_topics[topic] = max(matched_topics.get(topic, 0.0), weight * factor)
         
         # Sort by confidence and return top-k
         sorted_topics = sorted(
@@ -311,51 +438,104 @@ class TopicMapperService:
         )
         return [topic for topic, _ in sorted_topics[:top_k]]
 
+    def _select_candidates(self, terms_with_scores: List[Tuple[str, float]], 
+                         filename: str, top_k: int) -> List[str]:
+        """Select best matching topics with full document context"""
+        matches = self._match_terms(terms_with_scores, filename)
+        return self._rank_matches(terms_with_scores, matches, top_k)
+
+    def _write_has_topic(self, rows: List[Dict[str, str]]):
+        """MERGE (Paper)-[:HAS_TOPIC]->(Topic) for all rows, HAS_TOPIC_WRITE_BATCH rows per query."""
+        if not rows:
+            return
+        try:
+            for start in range(0, len(rows), HAS_TOPIC_WRITE_BATCH):
+                self.graph_service.graph.query("""
+                    UNWIND $rows AS row
+                    MATCH (p:Paper {filename: row.filename})
+                    MATCH (t:Topic {label: row.topic})
+                    MERGE (p)-[:HAS_TOPIC]->(t)
+                """, {"rows": rows[start:start + HAS_TOPIC_WRITE_BATCH]})
+            self.graph_service.bump_topic_link_version()
+            print(f"  Created {len(rows)} HAS_TOPIC relationships")
+        except Exception as e:
+            print(f"  Error creating relationships: {e}")
+
     def map_and_link(self, lsa_terms_by_doc: Dict[str, List[Tuple[str, float]]],
                      lda_terms_by_doc: Dict[str, List[Tuple[str, float]]],
                      top_k_each: int) -> Dict[str, List[str]]:
-        result = {}
-        
         all_files = sorted(set(list(lsa_terms_by_doc.keys()) + list(lda_terms_by_doc.keys())))
         
         print(f"Processing {len(all_files)} documents with FULL DOCUMENT CONTEXT...")
+        self._ensure_topic_embeddings()  # load once before the workers start
         
-        with tqdm(total=len(all_files), desc="Processing documents") as pbar:
-            for filename in all_files:
-                print(f"\n--- Processing: {filename} ---")
-                
-                context = self._get_document_context(filename)
-                print(f"Document context (first 150 chars): {context[:150]}...")
-                
-                terms_lsa = lsa_terms_by_doc.get(filename, [])
-                terms_lda = lda_terms_by_doc.get(filename, [])
-                
-                cand_lsa = self._select_candidates(terms_lsa, filename, top_k_each)
-                cand_lda = self._select_candidates(terms_lda, filename, top_k_each)
-                
-                all_matched = list(dict.fromkeys(cand_lsa + cand_lda))
-                
-                if all_matched:
-                    try:
-                        self.graph_service.graph.query("""
-                            UNWIND $rows AS row
-                            MATCH (p:Paper {filename: row.filename})
-                            MATCH (t:Topic {label: row.topic})
-                            MERGE (p)-[:HAS_TOPIC]->(t)
-                        """, {
-                            "rows": [
-                                {"filename": filename, "topic": topic}
-                                for topic in all_matched
-                            ]
-                        })
-                        print(f"  Created {len(all_matched)} HAS_TOPIC relationships")
-                    except Exception as e:
-                        print(f"  Error creating relationships: {e}")
-                
-                result[filename] = all_matched
+        def process_doc(filename: str) -> Tuple[str, List[str]]:
+            context = self._get_document_context(filename)
+            log.debug("Document context for %s (first 150 chars): %s...", filename, context[:150])
+            
+            terms_lsa = lsa_terms_by_doc.get(filename, [])
+            terms_lda = lda_terms_by_doc.get(filename, [])
+            
+            # Each unique term (case-insensitive) is matched once; LSA and LDA weights are on
+            # different scales, so each model still picks its own top_k_each from the shared matches
+            merged: Dict[str, Tuple[str, float]] = {}
+            for term, weight in list(terms_lsa) + list(terms_lda):
+                merged.setdefault(term.lower(), (term, weight))
+            matches = self._match_terms(list(merged.values()), filename)
+            
+            cand_lsa = self._rank_matches(terms_lsa, matches, top_k_each)
+            cand_lda = self._rank_matches(terms_lda, matches, top_k_each)
+            topics = list(dict.fromkeys(cand_lsa + cand_lda))
+            # one line per document; per-term detail is at DEBUG so parallel workers do not interleave
+            log.info("--- %s: %d terms, %d matched -> %s", filename, len(merged), len(matches), topics)
+            return filename, topics
+        
+        matched: Dict[str, List[str]] = {}
+        with tqdm(total=len(all_files), desc="Processing documents") as pbar, \
+                ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [pool.submit(process_doc, filename) for filename in all_files]
+            for fut in as_completed(futures):
+                filename, all_matched = fut.result()
+                matched[filename] = all_matched
                 pbar.update(1)
                 pbar.set_postfix({"Topics": len(all_matched)})
-                
-                time.sleep(2.0)
         
-        return result
\ No newline at end of file
+        result = {filename: matched[filename] for filename in all_files}
+        rows = [{"filename": filename, "topic": topic}
+                for filename, topics in result.items() for topic in topics]
+        
+        # One write pass for all documents (LLM calls are throttled by _llm_rate in _semantic_match)
+        self._write_has_topic(rows)
+        return result
+
+    def map_and_link_batched(self, lsa_terms_by_doc: Dict[str, List[Tuple[str, float]]],
+                             lda_terms_by_doc: Dict[str, List[Tuple[str, float]]],
+                             top_k_each: int, cso_service, index, labels: List[str],
+                             min_score: float = 0.75) -> Dict[str, List[str]]:
+        """Vector-search variant of map_and_link: one encode + FAISS search for all documents, no LLM calls"""
+        all_files = sorted(set(lsa_terms_by_doc) | set(lda_terms_by_doc))
+        print(f"Batch-mapping {len(all_files)} documents against the CSO embedding index...")
+
+        hits_lsa = cso_service.search_topics_by_doc(lsa_terms_by_doc, 1, index, labels)
+        hits_lda = cso_service.search_topics_by_doc(lda_terms_by_doc, 1, index, labels)
+
+        def _pick(terms: List[Tuple[str, float]], hits: List[List[Tuple[str, float]]]) -> List[str]:
+            matched = {}
+            for (_, weight), cand in zip(terms, hits):
+                if cand and cand[0][1] >= min_score:
+                    topic = cand[0][0]
+                    matched[topic] = max(matched.get(topic, 0.0), weight * cand[0][1])
+            ranked = sorted(matched.items(), key=lambda x: x[1], reverse=True)
+            return [topic for topic, _ in ranked[:top_k_each]]
+
+        result = {}
+        rows = []
+        for filename in all_files:
+            cand_lsa = _pick(lsa_terms_by_doc.get(filename, []), hits_lsa.get(filename, []))
+            cand_lda = _pick(lda_terms_by_doc.get(filename, []), hits_lda.get(filename, []))
+            all_matched = list(dict.fromkeys(cand_lsa + cand_lda))
+            result[filename] = all_matched
+            rows.extend({"filename": filename, "topic": topic} for topic in all_matched)
+
+        self._write_has_topic(rows)
+        return result
@@ -1,120 +1,471 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.messages import SystemMessage
+from services.llm_utils import FastJsonOutputParser
 from langchain_community.graphs import Neo4jGraph
+from services.llm_cache import LLMResponseCache, make_cache_key, llm_model_name
+import os
 import re
+import json
+import asyncio
+import threading
+import hashlib
+from collections import Counter
+from functools import lru_cache
 
+try:
+    import ahocorasick
+except Exception:
+    ahocorasick = None
+
+try:
+    import faiss
+except Exception:
+    faiss = None
+import numpy as np
+from services.log_utils import get_logger
+
+log = get_logger(__name__)
+
+# Validation verdicts are reused across papers/runs while the CSO snapshot is unchanged
+VALIDATION_CACHE_TTL = 30 * 24 * 3600
+# Uncached candidates are validated in chunks of this size, chunks run concurrently
+VALIDATION_CHUNK_SIZE = 4
+VALIDATION_MAX_CONCURRENCY = 8
+
+# Deterministic candidate -> CSO topic aliases checked before the LLM; extend via data/topic_aliases.json
+TOPIC_ALIASES_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "topic_aliases.json")
+DEFAULT_TOPIC_ALIASES = {
+    "mcdm": "decision support systems",
+    "ml": "machine learning",
+    "ai": "artificial intelligence",
+    "dl": "deep learning",
+}
+# CSO topics (nearest by embedding) sent to the validator per chunk of candidates, instead of the full list
+VALIDATION_SHORTLIST_K = 30
+
+# Nearest CSO topic by embedding is accepted without the LLM at or above this cosine similarity
+EMBED_ACCEPT_SIM = 0.92
+
+# A CSO label found inside a candidate is accepted if it has >= 2 words or covers this share of the candidate
+SUBSTRING_MIN_COVERAGE = 0.5
+_ACRONYM_RE = re.compile(r"\(\s*([A-Za-z][A-Za-z0-9-]{1,9})\s*\)")
+
+_PAREN_RE = re.compile(r"\s*\([^)]+\)\s*")
+_WS_RE = re.compile(r"\s+")
+
+@lru_cache(maxsize=4096)
 def normalize_text(text: str) -> str:
-    text = re.sub(r'\s*\([^)]+\)\s*', ' ', text)
-    text = re.sub(r'\s+', ' ', text.strip())
+    text = _PAREN_RE.sub(' ', text)
+    text = _WS_RE.sub(' ', text.strip())
     return text.lower()
 
 class TopicExtractionService:
-    def __init__(self, llm, graph_service):
+    def __init__(self, llm, graph_service, use_cache: bool = True,
+                 cache_ttl: Optional[int] = VALIDATION_CACHE_TTL,
+                 validation_chunk_size: int = VALIDATION_CHUNK_SIZE,
+                 max_concurrency: int = VALIDATION_MAX_CONCURRENCY,
+                 embed_model: Optional[str] = "sentence-transformers/all-MiniLM-L6-v2",
+                 shortlist_k: int = VALIDATION_SHORTLIST_K):
         self.llm = llm
         self.graph_service = graph_service
-        print("Fetching existing topics and hierarchy from Neo4j for validation...")
+        self.embed_model_name = embed_model  # None = always send the full CSO list
+        self.shortlist_k = shortlist_k
+        self._embedder = None
+        self._topic_emb: Optional[np.ndarray] = None
+        self._topic_index = None
+        self._index_lock = threading.Lock()
+        self.validation_chunk_size = max(1, validation_chunk_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.cache = LLMResponseCache(ttl=cache_ttl) if use_cache else None
+        self._validation_cache: Dict[str, Optional[str]] = {}
+        log.info("Fetching existing topics and hierarchy from Neo4j for validation...")
         self.cso_topics, self.hierarchy = self._fetch_topics_and_hierarchy_from_neo4j()
-        print(f"-> Found {len(self.cso_topics)} topics and {len(self.hierarchy)} hierarchical relationships in the graph.")
+        log.info("-> Found %d topics and %d hierarchical relationships in the graph.", len(self.cso_topics), len(self.hierarchy))
+        # normalized label -> original label (first one wins), built once for O(1) direct matches
+        self._norm_to_original: Dict[str, str] = {}
+        for topic in self.cso_topics:
+            self._norm_to_original.setdefault(normalize_text(topic), topic)
+        self._alias_map = self._load_alias_map()
+        self._automaton = self._build_automaton()
+        # prompt strings are constant for the service's lifetime
+        self._cso_joined = ", ".join(self.cso_topics)
+        self._hierarchy_joined = "; ".join(self.hierarchy)
+        self._hierarchy_by_topic: Dict[str, List[str]] = {}
+        for line in self.hierarchy:
+            for topic in line.split(" -> ", 1):
+                self._hierarchy_by_topic.setdefault(topic, []).append(line)
+        self._cso_version = hashlib.sha256(
+            f"{self._cso_joined}\n{self._hierarchy_joined}".encode("utf-8")
+        ).hexdigest()[:16]
         
-        self.parser = JsonOutputParser(pydantic_object=List[str])
-        self.validate_parser = JsonOutputParser(pydantic_object=dict)
+        self.parser = FastJsonOutputParser(pydantic_object=List[str])
+        self.validate_parser = FastJsonOutputParser(pydantic_object=List[dict])
         self.extract_prompt = ChatPromptTemplate.from_template(
             """Berdasarkan teks paper akademik berikut, identifikasi hingga **10 topik ilmiah utama** yang dibahas.
             Fokus pada konsep ilmiah spesifik dalam ilmu komputer, contohnya 'Content-Based Filtering', 'Information 
             Retrieval', 'Text Mining', atau 'Machine Learning'. Hindari topik umum seperti 'ilmu komputer' dan/atau 
             'computer science'. Kembalikan topik dalam bentuk daftar JSON berisi string. Teks: ```{text}```\n\nJSON Output: """
         )
-        self.validate_prompt = ChatPromptTemplate.from_template(
-            """Anda adalah ahli ontologi ilmu komputer. Validasi topik kandidat: ```{candidate}``` terhadap daftar topik Computer 
-            Science Ontology CSO: ```{cso_topics}```, dengan hierarki (sub_topic -> super_topic): ```{hierarchy}```. 
+        # Instructions are a fixed system prefix; the CSO shortlist, its hierarchy and the candidates vary per call
+        validate_system = SystemMessage(content=
+            """Anda adalah ahli ontologi ilmu komputer. Validasi SETIAP topik kandidat yang diberikan user (daftar JSON) 
+            terhadap daftar topik Computer Science Ontology CSO dan hierarki (sub_topic -> super_topic) yang diberikan user. 
             - Jika topik kandidat (setelah normalisasi: lowercase, tanpa spasi ekstra, tanpa tanda kurung) ada di CSO, 
               kembalikan topik asli dari database.
             - Jika tidak, cari topik CSO yang relevan secara semantik dalam konteks ilmu komputer atau aplikasinya (misalnya, MCDM 
               dipetakan ke 'decision support systems'). Contoh:
-                - Kandidat: "encrypted data", CSO: ["data privacy", "security"], Hasil: {{"candidate": "encrypted data", 
-                  "matched_topic": "data privacy"}}
+                - Kandidat: "encrypted data", CSO: ["data privacy", "security"], Hasil: {"candidate": "encrypted data", 
+                  "matched_topic": "data privacy"}
                 - Kandidat: "Multi-Criteria Decision-Making (MCDM)", CSO: ["decision support systems"], 
-                  Hasil: {{"candidate": "Multi-Criteria Decision-Making (MCDM)", "matched_topic": "decision support systems"}}
-            - Jangan gunakan 'computer science' sebagai kecocokan.
+                  Hasil: {"candidate": "Multi-Criteria Decision-Making (MCDM)", "matched_topic": "decision support systems"}
+            - Hanya pilih topik dari daftar CSO yang diberikan. Jangan gunakan 'computer science' sebagai kecocokan.
             - Jika tidak ada kecocokan semantik (skor < 90%), kembalikan 'None' dengan alasan.
-            Output JSON: {{"candidate": "<candidate>", "matched_topic": "<matched_topic>", "reason": "<alasan jika None>"}}.
+            Output: daftar JSON dengan satu objek per kandidat, urutan sama dengan input:
+            [{"candidate": "<candidate>", "matched_topic": "<matched_topic>", "reason": "<alasan jika None>"}, ...].
             """
         )
+        self.validate_prompt = ChatPromptTemplate.from_messages([
+            validate_system,
+            ("human", "Topik CSO: ```{cso_topics}```\nHierarki: ```{hierarchy}```\n"
+                      "Kandidat: ```{candidates}```\n\nJSON Output: "),
+        ])
         self.extract_chain = self.extract_prompt | self.llm | self.parser
         self.validate_chain = self.validate_prompt | self.llm | self.validate_parser
 
     def _fetch_topics_and_hierarchy_from_neo4j(self) -> tuple:
         """Fetches all topic labels and hierarchy from Neo4j."""
         try:
-            # take all topics, except "computer science"
-            topic_results = self.graph_service.graph.query(
-                "MATCH (t:Topic) WHERE t.label <> 'computer science' RETURN t.label AS label"
-            )
-            topics = [record['label'] for record in topic_results]
-            if not topics:
-                print("  > Warning: No topics found in Neo4j database!")
-
-            # hierarchy
-            hierarchy_results = self.graph_service.graph.query(
+            # all topics and hierarchy (except "computer science") in one round trip
+            results = self.graph_service.graph.query(
                 """
-                MATCH (sub:Topic)-[:SUB_TOPIC_OF]->(super:Topic)
+                MATCH (t:Topic) WHERE t.label <> 'computer science'
+                WITH collect(t.label) AS topics
+                OPTIONAL MATCH (sub:Topic)-[:SUB_TOPIC_OF]->(super:Topic)
                 WHERE sub.label <> 'computer science' AND super.label <> 'computer science'
-                RETURN sub.label AS sub_topic, super.label AS super_topic
+                RETURN topics, collect(sub.label + ' -> ' + super.label) AS hierarchy
                 """
             )
-            hierarchy = [f"{record['sub_topic']} -> {record['super_topic']}" for record in hierarchy_results]
+            record = results[0] if results else {}
+            topics = list(record.get('topics') or [])
+            if not topics:
+                log.warning("  > Warning: No topics found in Neo4j database!")
+            hierarchy = list(record.get('hierarchy') or [])
             if not hierarchy:
-                print("  > Warning: No hierarchy found in Neo4j database!")
+                log.warning("  > Warning: No hierarchy found in Neo4j database!")
             
             return topics, hierarchy
         except Exception as e:
-            print(f"  > Error fetching topics/hierarchy from Neo4j: {e}")
+            log.warning("  > Error fetching topics/hierarchy from Neo4j: %s", e)
             return [], []
 
+    def _load_alias_map(self) -> Dict[str, str]:
+        """normalized alias -> original CSO label, keeping only aliases whose target exists in the graph."""
+        aliases = dict(DEFAULT_TOPIC_ALIASES)
+        if os.path.exists(TOPIC_ALIASES_PATH):
+            try:
+                with open(TOPIC_ALIASES_PATH, "r", encoding="utf-8") as f:
+                    aliases.update(json.load(f))
+            except Exception as e:
+                log.warning("  > Could not read topic aliases (%s); using built-in aliases only.", e)
+        alias_map = {}
+        for alias, target in aliases.items():
+            original = self._norm_to_original.get(normalize_text(str(target)))
+            if original is not None:
+                alias_map[normalize_text(str(alias))] = original
+        return alias_map
+
+    def _build_automaton(self):
+        """Aho-Corasick automaton over ' label ' (space-padded = whole words); None without pyahocorasick."""
+        if ahocorasick is None or not self._norm_to_original:
+            return None
+        automaton = ahocorasick.Automaton()
+        for norm, original in self._norm_to_original.items():
+            automaton.add_word(f" {norm} ", (norm, original))
+        automaton.make_automaton()
+        return automaton
+
+    def _substring_match(self, norm: str) -> Optional[str]:
+        """Longest CSO label contained (as whole words) in the normalized candidate."""
+        best = None
+        if self._automaton is not None:
+            for _, (key, original) in self._automaton.iter(f" {norm} "):
+                if key != norm and (best is None or len(key) > len(best[0])):
+                    best = (key, original)
+        else:
+            words = norm.split()
+            for n in range(len(words) - 1, 0, -1):
+                for i in range(len(words) - n + 1):
+                    key = " ".join(words[i:i + n])
+                    original = self._norm_to_original.get(key)
+                    if original is not None and (best is None or len(key) > len(best[0])):
+                        best = (key, original)
+                if best is not None:
+                    break
+        if best is None:
+            return None
+        key, original = best
+        if " " in key or len(key) >= SUBSTRING_MIN_COVERAGE * len(norm):
+            return original
+        return None
+
+    @staticmethod
+    def _keys(candidate: str) -> List[str]:
+        norm = normalize_text(candidate)
+        return [norm, norm.replace("-", " ")]
+
+    def _exact(self, candidate: str) -> Optional[str]:
+        """Tier 1: normalized label, also with hyphens read as spaces."""
+        for key in self._keys(candidate):
+            hit = self._norm_to_original.get(key)
+            if hit is not None:
+                return hit
+        return None
+
+    def _alias(self, candidate: str) -> Optional[str]:
+        """Tier 2: alias table, then an acronym given in parentheses ('... (MCDM)')."""
+        keys = self._keys(candidate)
+        m = _ACRONYM_RE.search(candidate)
+        if m:
+            keys.append(m.group(1).lower())
+        for key in keys:
+            hit = self._alias_map.get(key) or (self._norm_to_original.get(key) if m else None)
+            if hit is not None:
+                return hit
+        return None
+
+    def _substring(self, candidate: str) -> Optional[str]:
+        """Tier 3: longest CSO label contained in the candidate."""
+        return self._substring_match(self._keys(candidate)[1])
+
+    def _embed_top1(self, candidates: List[str]) -> List[Optional[str]]:
+        """Tier 4: nearest CSO topic by embedding per candidate, only when it is very close.
+        Loads the model and encodes, so it runs in a worker thread, never on the event loop."""
+        if not candidates or not self._ensure_topic_index():
+            return [None] * len(candidates)
+        q = self._embedder.encode(candidates, normalize_embeddings=True, convert_to_numpy=True,
+                                  show_progress_bar=False).astype(np.float32)
+        if self._topic_index is not None:
+            sims, idx = self._topic_index.search(q, 1)
+            best, sim = idx[:, 0], sims[:, 0]
+        else:
+            all_sims = q @ self._topic_emb.T
+            best = np.argmax(all_sims, axis=1)
+            sim = all_sims[np.arange(len(candidates)), best]
+        return [self.cso_topics[int(b)] if b >= 0 and s >= EMBED_ACCEPT_SIM else None
+                for b, s in zip(best, sim)]
+
+    def _resolve_locally(self, candidate: str) -> Tuple[Optional[str], Optional[str]]:
+        """String tiers, cheapest first; returns (tier, topic) or (None, None) if embedding/LLM must decide."""
+        for tier, check in (("exact", self._exact), ("alias", self._alias), ("substring", self._substring)):
+            hit = check(candidate)
+            if hit is not None:
+                return tier, hit
+        return None, None
+
+    def _resolve_remaining(self, candidates: List[str]) -> Tuple[Dict[str, str], Dict[str, Optional[str]]]:
+        """Worker-thread half: embedding tier for the chunk, then the validator for whatever is left."""
+        embedded = {c: hit for c, hit in zip(candidates, self._embed_top1(candidates)) if hit is not None}
+        rest = [c for c in candidates if c not in embedded]
+        return embedded, (self._validate_candidates(rest) if rest else {})
+
     def get_validated_topics_for_text(self, full_text: str) -> list:
         """Extracts candidate topics with LLM and validates them against CSO topics."""
+        return asyncio.run(self.aget_validated_topics_for_text(full_text))
+
+    async def aget_validated_topics_for_text(self, full_text: str) -> list:
+        """Streams the extractor output; each candidate is matched as soon as it is complete and
+        unmatched ones are validated in background chunks while the extractor is still generating."""
+        validated_topics = set()
+        seen = set()
+        pending: List[str] = []
+        tasks = []
+        tier_hits = Counter()
+
+        def _accept(candidate) -> None:
+            # Same topic repeated with different casing/spacing is validated once
+            if not isinstance(candidate, str):
+                return
+            norm = normalize_text(candidate)
+            if not norm or norm in seen:
+                return
+            seen.add(norm)
+            # Tier murah dulu (normalisasi, alias, substring); embedding dan LLM di worker thread
+            tier, original_topic = self._resolve_locally(candidate)
+            if original_topic is not None:
+                tier_hits[tier] += 1
+                validated_topics.add(original_topic)
+                log.debug("  > Validated topic: %s -> %s (%s)", candidate, original_topic, tier)
+                return
+            pending.append(candidate)
+            if len(pending) >= self.validation_chunk_size:
+                tasks.append(asyncio.create_task(asyncio.to_thread(self._resolve_remaining, pending[:])))
+                pending.clear()
+
+        # load the embedding model / topic index while the extractor is generating
+        index_task = asyncio.create_task(asyncio.to_thread(self._ensure_topic_index))
+        candidate_topics, final = [], []
         try:
-            candidate_topics = self.extract_chain.invoke({"text": full_text})
-            print(f"  > LLM candidate topics: {candidate_topics}")
+            async for partial in self.extract_chain.astream({"text": full_text}):
+                if not isinstance(partial, list):
+                    continue
+                # every item but the last is complete; the last may still be streaming
+                for candidate in partial[len(candidate_topics):-1]:
+                    candidate_topics.append(candidate)
+                    _accept(candidate)
+                final = partial
+            for candidate in final[len(candidate_topics):]:
+                candidate_topics.append(candidate)
+                _accept(candidate)
+            log.debug("  > LLM candidate topics: %s", candidate_topics)
         except Exception as e:
-            print(f"  > LLM topic extraction failed: {e}")
+            log.warning("  > LLM topic extraction failed: %s", e)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(index_task, return_exceptions=True)
             return []
 
         if not candidate_topics:
-            print("  > No candidate topics extracted by LLM.")
+            await asyncio.gather(index_task, return_exceptions=True)
+            log.info("  > No candidate topics extracted by LLM.")
             return []
 
-        validated_topics = set()
-        # normalize
-        normalized_cso_topics = {t: normalize_text(t) for t in self.cso_topics}
-
-        for candidate in candidate_topics:
-            try:
-                # Cek kecocokan langsung dengan normalisasi
-                normalized_candidate = normalize_text(candidate)
-                for original_topic, normalized_topic in normalized_cso_topics.items():
-                    if normalized_candidate == normalized_topic:
-                        print(f"  > Candidate '{candidate}' matches database topic '{original_topic}' after normalization.")
-                        validated_topics.add(original_topic)
-                        print(f"  > Validated topic: {candidate} -> {original_topic}")
-                        break
+        # if no direct match, resolve all remaining candidates (embedding, cached verdicts, then the LLM)
+        if pending:
+            tasks.append(asyncio.create_task(asyncio.to_thread(self._resolve_remaining, pending[:])))
+        await asyncio.gather(index_task, return_exceptions=True)
+        for embedded, verdicts in await asyncio.gather(*tasks):
+            tier_hits["embedding"] += len(embedded)
+            tier_hits["validator"] += len(verdicts)
+            for candidate, original_topic in embedded.items():
+                validated_topics.add(original_topic)
+                log.debug("  > Validated topic: %s -> %s (embedding)", candidate, original_topic)
+            for candidate, matched_topic in verdicts.items():
+                if matched_topic:
+                    validated_topics.add(matched_topic)
+                    log.debug("  > Validated topic: %s -> %s (llm)", candidate, matched_topic)
                 else:
-                    # if no direct match, validate with LLM
-                    validation_result = self.validate_chain.invoke({
-                        "candidate": candidate,
-                        "cso_topics": ", ".join(self.cso_topics),
-                        "hierarchy": "; ".join(self.hierarchy)
-                    })
-                    print(f"  > Validation result: {validation_result}")
-                    if validation_result["matched_topic"] != "None":
-                        validated_topics.add(validation_result["matched_topic"])
-                        print(f"  > Validated topic: {candidate} -> {validation_result['matched_topic']}")
-                    else:
-                        print(f"  > No match for candidate topic: {candidate}")
-            except Exception as e:
-                print(f"  > Error validating topic {candidate}: {e}")
+                    log.debug("  > No match for candidate topic: %s", candidate)
         
+        log.info("  > %d candidate(s) -> %d topic(s); resolved per tier: %s",
+                 len(candidate_topics), len(validated_topics), dict(tier_hits))
         if not validated_topics:
-            print(f"  > No validated topics found. Sample CSO topics: {self.cso_topics[:10]}")
-        return list(validated_topics)
\ No newline at end of file
+            log.info("  > No validated topics found. Sample CSO topics: %s", self.cso_topics[:10])
+        return list(validated_topics)
+
+    def _ensure_topic_index(self) -> bool:
+        """Embed CSO topics once (L2-normalized float32, FAISS inner-product index if available)."""
+        with self._index_lock:
+            return self._load_topic_index()
+
+    def _load_topic_index(self) -> bool:
+        if self._topic_emb is None and self.embed_model_name and self.cso_topics:
+            try:
+                from sentence_transformers import SentenceTransformer
+                self._embedder = SentenceTransformer(self.embed_model_name)
+                log.info("  > Embedding %d CSO topics for validator shortlists...", len(self.cso_topics))
+                self._topic_emb = self._embedder.encode(
+                    self.cso_topics, batch_size=256, normalize_embeddings=True,
+                    convert_to_numpy=True, show_progress_bar=False
+                ).astype(np.float32)
+                if faiss is not None:
+                    self._topic_index = faiss.IndexFlatIP(self._topic_emb.shape[1])
+                    self._topic_index.add(self._topic_emb)
+            except Exception as e:
+                log.warning("  > Topic embeddings unavailable (%s); sending the full CSO list.", e)
+                self.embed_model_name = None
+        return self._topic_emb is not None
+
+    def _shortlist(self, candidates: List[str]) -> Optional[List[str]]:
+        """Union of the shortlist_k nearest CSO topics of each candidate (None = use the full list)."""
+        if self.shortlist_k <= 0 or self.shortlist_k >= len(self.cso_topics) or not self._ensure_topic_index():
+            return None
+        q = self._embedder.encode(candidates, normalize_embeddings=True, convert_to_numpy=True,
+                                  show_progress_bar=False).astype(np.float32)
+        if self._topic_index is not None:
+            _, idx = self._topic_index.search(q, self.shortlist_k)
+        else:
+            sims = q @ self._topic_emb.T
+            idx = np.argpartition(-sims, self.shortlist_k - 1, axis=1)[:, :self.shortlist_k]
+        return list(dict.fromkeys(self.cso_topics[i] for row in idx for i in row if i >= 0))
+
+    def _validation_inputs(self, candidates: List[str]) -> Dict[str, str]:
+        shortlist = self._shortlist(candidates)
+        if shortlist is None:
+            cso_topics, hierarchy = self._cso_joined, self._hierarchy_joined
+        else:
+            lines = dict.fromkeys(line for topic in shortlist for line in self._hierarchy_by_topic.get(topic, ()))
+            cso_topics, hierarchy = ", ".join(shortlist), "; ".join(lines)
+        return {
+            "candidates": json.dumps(candidates, ensure_ascii=False),
+            "cso_topics": cso_topics,
+            "hierarchy": hierarchy,
+        }
+
+    def _validation_key(self, candidate: str) -> str:
+        return make_cache_key("topic_validation", self._cso_version, llm_model_name(self.llm),
+                              normalize_text(candidate))
+
+    def _validate_candidates(self, candidates: List[str]) -> Dict[str, Optional[str]]:
+        """candidate -> matched CSO topic (None = no match); only cache misses are sent to the LLM."""
+        verdicts: Dict[str, Optional[str]] = {}
+        misses = []
+        for candidate in candidates:
+            key = self._validation_key(candidate)
+            if key in self._validation_cache:
+                verdicts[candidate] = self._validation_cache[key]
+                continue
+            cached = self.cache.get(key) if self.cache else None
+            if isinstance(cached, dict):
+                verdicts[candidate] = self._validation_cache[key] = cached.get("matched_topic")
+                continue
+            misses.append(candidate)
+        if verdicts:
+            log.debug("  > Cached validation for %d candidate(s)", len(verdicts))
+        if not misses:
+            return verdicts
+
+        size = self.validation_chunk_size
+        chunks = [misses[i:i + size] for i in range(0, len(misses), size)]
+        outputs = self.validate_chain.batch(
+            [self._validation_inputs(chunk) for chunk in chunks],
+            config={"max_concurrency": self.max_concurrency},
+            return_exceptions=True,
+        )
+
+        answered = {}
+        for chunk, validation_results in zip(chunks, outputs):
+            if isinstance(validation_results, Exception):
+                log.warning("  > Error validating topics %s: %s", chunk, validation_results)
+                continue
+            if isinstance(validation_results, dict):
+                validation_results = [validation_results]
+            log.debug("  > Validation results: %s", validation_results)
+            by_norm = {normalize_text(c): c for c in chunk}
+            results = [r for r in validation_results or [] if isinstance(r, dict)]
+            for pos, result in enumerate(results):
+                # echo may differ in case/spacing; else fall back to position (the prompt asks for input order)
+                echoed = result.get("candidate")
+                candidate = by_norm.get(normalize_text(echoed)) if isinstance(echoed, str) else None
+                if candidate is None and len(results) == len(chunk):
+                    candidate = chunk[pos]
+                if candidate is None or candidate in answered:
+                    continue
+                matched_topic = result.get("matched_topic")
+                if not isinstance(matched_topic, str) or matched_topic == "None":
+                    answered[candidate] = None
+                    continue
+                topic = self._exact(matched_topic)
+                if topic is None:
+                    # not a CSO label: neither trusted nor cached
+                    log.warning("  > Validator returned unknown topic %s for %s", matched_topic, candidate)
+                    continue
+                answered[candidate] = topic
+        for candidate in misses:
+            if candidate in answered:
+                key = self._validation_key(candidate)
+                self._validation_cache[key] = answered[candidate]
+                if self.cache:
+                    self.cache.set(key, {"matched_topic": answered[candidate]})
+            verdicts[candidate] = answered.get(candidate)
+        return verdicts